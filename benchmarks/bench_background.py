@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: background correction, speed, peak memory and quality
+
+A synthetic uint16 image (smooth uneven background, noise and Gaussian
+puncta) is corrected by every engine in background.ENGINES, on the whole
+image, and by the reconstruction tile by tile. Results are compared with
+the whole-image reconstruction (the reference) and with the known puncta
+signal, smoothed like the image; errors are in 16-bit counts. Peak memory
+is traced in this process only, so worker processes are not included.
+
+run from the repository root:
+    python -m benchmarks.bench_background [--size 2048] [--tile 512] [--workers 2]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workshop"))
+from puncta.background import ENGINES, subtract_background, reconstruct_background_tiled
+
+
+def make_image(size, nPuncta=None, seed=0):
+    """ uint16 image with a tilted, wavy background and Gaussian puncta """
+    rng = np.random.default_rng(seed)
+    nPuncta = nPuncta or size**2 // 4000
+    yy, xx = np.mgrid[:size, :size].astype(float)
+    bg = 2000 + 0.2*xx + 800*np.sin(xx/(size/5))*np.cos(yy/(size/7))
+    img = bg + rng.normal(0, 50, bg.shape)
+    del yy, xx
+    truth = np.zeros_like(img)
+    win = np.arange(-8, 9)
+    for x, y, s in zip(rng.uniform(10, size - 10, nPuncta),
+                       rng.uniform(10, size - 10, nPuncta), rng.uniform(1, 2, nPuncta)):
+        c, r = int(x), int(y)
+        truth[r-8:r+9, c-8:c+9] += 3000*np.exp(-((win[None, :] + c - x)**2
+                                                 + (win[:, None] + r - y)**2)/(2*s**2))
+    img += truth
+    return np.clip(img, 0, 65535).astype(np.uint16), truth / 65535, bg / 65535
+
+
+def measure(func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, dt, peak / 2**20
+
+
+def rms(diff):
+    return np.sqrt(np.mean(diff**2)) * 65535
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--tile", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    img, truth, _ = make_image(args.size)
+    truth = ndimage.gaussian_filter(truth, 1)
+    print(f"{args.size}x{args.size} uint16 image, {img.nbytes/2**20:.0f} MB")
+    print(f"{'engine':<28} {'s':>7} {'peak MB':>8} {'rms vs ref':>11} {'rms vs true':>12} {'corr':>6}")
+    ref = subtract_background(img, "reconstruction")
+    for method in ENGINES:
+        res, dt, peak = measure(lambda: subtract_background(img, method))
+        print(f"{method:<28} {dt:>7.2f} {peak:>8.0f} {rms(res - ref):>11.1f} "
+              f"{rms(res - truth):>12.1f} {np.corrcoef(res.ravel(), truth.ravel())[0, 1]:>6.3f}")
+        del res
+
+    print(f"\n{'reconstruction, tiled':<28} {'s':>7} {'peak MB':>8} {'max |diff|':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = [("tiled", {}),
+                 (f"tiled, {args.workers} workers", {"workers": args.workers}),
+                 ("tiled, memory-mapped out", {"out": str(Path(tmp) / "out.npy")})]
+        for name, kw in modes:
+            res, dt, peak = measure(lambda: reconstruct_background_tiled(
+                img, tileSize=args.tile, **kw))
+            print(f"{name:<28} {dt:>7.2f} {peak:>8.0f} {np.abs(res - ref).max():>11.2e}")
+            del res
+
+
+if __name__ == "__main__":
+    main()
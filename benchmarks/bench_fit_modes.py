@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: punctum fit modes, speed and localization accuracy
+
+Synthetic cells with one Gaussian punctum each (known center and sigma)
+are fit by the 3x-zoom path, the native-pixel Gaussian and centroid modes
+of Cell.fit_punctum, and the batched FOV.fit_all_puncta.
+
+run from the repository root:
+    python -m benchmarks.bench_fit_modes [--cells 200]
+"""
+
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workshop"))
+from puncta import FOV
+from puncta.data import Cell
+
+
+def make_fov(nCells, size=40, noise=3.0, seed=0):
+    """ FOV of `size` square cells on a grid, one punctum near each center """
+    rng = np.random.default_rng(seed)
+    nSide = int(np.ceil(np.sqrt(nCells)))
+    img = rng.normal(0, noise, (nSide*size, nSide*size))
+    yy, xx = np.mgrid[:size, :size]
+    truth = []
+    fov = FOV(img)
+    for k in range(nCells):
+        r0, c0 = (k // nSide)*size, (k % nSide)*size
+        x, y = rng.uniform(size/2 - 5, size/2 + 5, 2)
+        sig = rng.uniform(1.0, 2.0)
+        img[r0:r0+size, c0:c0+size] += 100*np.exp(-((xx - x)**2 + (yy - y)**2)/(2*sig**2))
+        fov._cells.append(Cell(fov, [c0, c0+size, r0, r0+size], f"{fov._id}:{k:03d}"))
+        truth.append((x, y, sig))
+    return fov, np.array(truth), rng
+
+
+def seed(fov, truth, rng):
+    """ hand-placed seeds: within 1.5 px of the truth, r=2 """
+    for cell, (x, y, _) in zip(fov, truth):
+        cell.add_punctum((x + rng.uniform(-1.5, 1.5), y + rng.uniform(-1.5, 1.5)))
+        cell.converged = None
+
+
+def score(fov, truth):
+    ok = np.array([c.punctum is not None and c.converged is not False for c in fov])
+    est = np.array([(c.punctum.x, c.punctum.y, c.punctum.r/1.5) for c in fov])
+    dist = np.hypot(*(est[:, :2] - truth[:, :2]).T)[ok]
+    sigErr = np.abs(est[:, 2] - truth[:, 2])[ok]
+    return ok.mean(), np.median(dist), np.percentile(dist, 95), np.median(sigErr)
+
+
+def per_cell(mode):
+    def run(fov):
+        for cell in fov:
+            try:
+                cell.fit_punctum(isTesting=False, mode=mode)
+            except RuntimeError:   # curve_fit did not converge
+                cell.converged = False
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, default=200)
+    args = parser.parse_args()
+
+    fov, truth, rng = make_fov(args.cells)
+    paths = [("zoom (per cell)", per_cell("zoom")),
+             ("native (per cell)", per_cell("native")),
+             ("centroid (per cell)", per_cell("centroid")),
+             ("batch native", lambda f: f.fit_all_puncta(mode="native")),
+             ("batch crop", lambda f: f.fit_all_puncta(mode="crop"))]
+
+    print(f"{'path':<22} {'ms/cell':>8} {'ok':>6} {'med err':>8} {'p95 err':>8} {'sig err':>8}")
+    for name, run in paths:
+        seed(fov, truth, rng)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            t0 = time.perf_counter()
+            run(fov)
+            dt = time.perf_counter() - t0
+        ok, med, p95, sigErr = score(fov, truth)
+        print(f"{name:<22} {dt/len(fov)*1e3:>8.2f} {ok:>6.0%} {med:>8.3f} {p95:>8.3f} {sigErr:>8.3f}")
+    print("errors in native pixels")
+
+
+if __name__ == "__main__":
+    main()
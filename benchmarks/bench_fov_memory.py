@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: peak memory of FOV processing by dtype policy
+
+A synthetic uint16 image is background-corrected twice (the second time
+into the existing buffer), its puncta detected, and the FOV saved, with
+the corrected image in float64 and in float32. Peak memory above the
+image itself is traced per stage; the stacked H x W x 2 float64 copy the
+old `save` made is shown for comparison.
+
+run from the repository root:
+    python -m benchmarks.bench_fov_memory [--size 2048] [--method reconstruction]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workshop"))
+from puncta import FOV
+from benchmarks.bench_background import make_image
+
+
+def traced(func):
+    """ (seconds, peak MB) of `func()` above the memory in use before """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    func()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--method", default="reconstruction")
+    args = parser.parse_args()
+
+    img, _, _ = make_image(args.size)
+    print(f"{args.size}x{args.size} uint16 image, {img.nbytes/2**20:.0f} MB; "
+          f"background method '{args.method}'")
+    print(f"{'dtype':<8} {'stage':<22} {'s':>7} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in (np.float64, np.float32):
+            fov = FOV(img, dtype=dtype)
+            stages = [("correct_background", lambda: fov.correct_background(method=args.method)),
+                      ("correct_background 2", lambda: fov.correct_background(method=args.method,
+                                                                              inplace=True)),
+                      ("detect_puncta", lambda: fov.detect_puncta(newCells=False)),
+                      ("save", lambda: fov.save(Path(tmp) / "fov.hdf5", compression="lzf"))]
+            for name, func in stages:
+                dt, peak = traced(func)
+                print(f"{np.dtype(dtype).name:<8} {name:<22} {dt:>7.2f} {peak:>8.0f}")
+            dt, peak = traced(lambda: np.stack((fov.img.astype(float), fov._img), axis=2))
+            print(f"{'':<8} {'(stacked save copy)':<22} {dt:>7.2f} {peak:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
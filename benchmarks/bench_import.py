@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: import time of the shapes package
+
+Each import runs in a fresh interpreter. Exits with status 1 if the
+geometry core pulls in matplotlib or costs more than `--max-ms`
+on top of importing numpy.
+
+run from the repository root:
+    python -m benchmarks.bench_import [--repeat 10] [--max-ms 50]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+print(t1 - t0, int("matplotlib" in sys.modules))
+"""
+
+
+def time_import(module, repeat):
+    times, mpl = [], False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", SNIPPET.format(module=module)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        mpl = mpl or bool(int(out[1]))
+    return statistics.median(times), mpl
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    tNumpy, _ = time_import("numpy", args.repeat)
+    tShapes, mplCore = time_import("shapes", args.repeat)
+    tGraphics, _ = time_import("shapes.graphics", args.repeat)
+    overhead = (tShapes - tNumpy) * 1e3
+
+    print(f"{'numpy':<18} {tNumpy*1e3:8.1f} ms")
+    print(f"{'shapes':<18} {tShapes*1e3:8.1f} ms   (+{overhead:.1f} ms over numpy)")
+    print(f"{'shapes.graphics':<18} {tGraphics*1e3:8.1f} ms")
+
+    failed = False
+    if mplCore:
+        print("REGRESSION: 'import shapes' imports matplotlib")
+        failed = True
+    if overhead > args.max_ms:
+        print(f"REGRESSION: shapes import overhead above {args.max_ms:.0f} ms")
+        failed = True
+    sys.exit(int(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: overhead of the instrumentation layer
+
+Times a trivial function bare, wrapped by `Instrument.timed` while
+disabled and enabled (with and without tracemalloc), and the per-cell
+Cell.fit_punctum in native mode with instrumentation off and on.
+
+run from the repository root:
+    python -m benchmarks.bench_instrument
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workshop"))
+from puncta.instrument import Instrument, INSTRUMENT
+from benchmarks.bench_fit_modes import make_fov, seed
+
+
+def per_call(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number
+
+
+def main():
+    inst = Instrument()
+
+    def bare():
+        return None
+    wrapped = inst.timed("noop")(bare)
+
+    print(f"{'case':<36} {'us/call':>9}")
+    print(f"{'bare function':<36} {per_call(bare, 100_000)*1e6:>9.3f}")
+    print(f"{'timed, disabled':<36} {per_call(wrapped, 100_000)*1e6:>9.3f}")
+    inst.enable()
+    print(f"{'timed, enabled':<36} {per_call(wrapped, 10_000)*1e6:>9.3f}")
+    inst.enable(memory=True)
+    print(f"{'timed, enabled with tracemalloc':<36} {per_call(wrapped, 10_000)*1e6:>9.3f}")
+    inst.disable()
+
+    fov, truth, rng = make_fov(200)
+
+    def fit_all():
+        seed(fov, truth, rng)
+        for cell in fov:
+            cell.fit_punctum(isTesting=False, mode="native")
+    off = per_call(fit_all, 3) / len(fov)
+    INSTRUMENT.enable()
+    on = per_call(fit_all, 3) / len(fov)
+    INSTRUMENT.disable()
+    print(f"{'fit_punctum (native), disabled':<36} {off*1e6:>9.1f}")
+    print(f"{'fit_punctum (native), enabled':<36} {on*1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: memory per shape instance
+
+Compares the slotted shape classes with plain classes holding the same
+instance attributes in a per-instance __dict__ (the layout before __slots__).
+
+run from the repository root:
+    python -m benchmarks.bench_memory
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+import shapes
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workshop"))
+try:
+    import puncta
+except ImportError:   # puncta needs scipy, scikit-image and h5py
+    puncta = None
+
+N = 100_000
+
+
+class DictShape():
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+        self._coords = None
+
+
+class DictCircle(DictShape):
+    def __init__(self, x, y, r):
+        super().__init__(x, y)
+        self._r = r
+
+
+class DictSquare(DictShape):
+    def __init__(self, x, y, w):
+        super().__init__(x, y)
+        self._w = w
+
+
+class DictRectangle(DictSquare):
+    def __init__(self, x, y, w, h):
+        super().__init__(x, y, w)
+        self._h = h
+
+
+class DictPunctum():
+    def __init__(self, x, y, r):
+        self.x = x
+        self.y = y
+        self._r = r
+
+
+def bytes_per_instance(factory, n=N):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory(j) for j in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list itself holds one pointer per object
+    return (after - before - sys.getsizeof(objs)) / n
+
+
+def main():
+    cases = [("shapes.Circle",
+              lambda j: DictCircle(j, j, 1.0 + j),
+              lambda j: shapes.Circle(j, j, 1.0 + j)),
+             ("shapes.Square",
+              lambda j: DictSquare(j, j, 1.0 + j),
+              lambda j: shapes.Square(j, j, 1.0 + j)),
+             ("shapes.Rectangle",
+              lambda j: DictRectangle(j, j, 1.0 + j, 2.0 + j),
+              lambda j: shapes.Rectangle(j, j, 1.0 + j, 2.0 + j))]
+    if puncta is not None:
+        cases.append(("puncta.Circle",
+                      lambda j: DictPunctum(j, j, 1.0 + j),
+                      lambda j: puncta.Circle(j, j, 1.0 + j)))
+
+    print(f"{'class':<18} {'__dict__ [B]':>13} {'__slots__ [B]':>14} {'saved':>7}")
+    for name, makeOld, makeNew in cases:
+        old = bytes_per_instance(makeOld)
+        new = bytes_per_instance(makeNew)
+        print(f"{name:<18} {old:>13.0f} {new:>14.0f} {1 - new/old:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark: ShapeGrid spatial index vs. brute force
+
+run from the repository root:
+    python -m benchmarks.bench_spatial
+"""
+
+import time
+import numpy as np
+import shapes
+
+SIZES = (10**3, 10**4, 10**5, 10**6)
+N_QUERIES = 200
+PY_SCAN_MAX = 10**5   # pure Python scans beyond this take too long
+
+
+def timeit(func, *args, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = func(*args)
+    return (time.perf_counter() - t0) / repeat, out
+
+
+def make_circles(n, rng):
+    side = np.sqrt(n) * 10
+    return shapes.CircleArray(rng.uniform(0, side, n), rng.uniform(0, side, n),
+                              rng.uniform(0.5, 5, n)), side
+
+
+def main():
+    rng = np.random.default_rng(42)
+    header = f"{'N':>9} {'query':>8} {'grid [us]':>11} {'numpy [us]':>11} {'python [us]':>12}"
+    print(header)
+    print("-" * len(header))
+    for n in SIZES:
+        circles, side = make_circles(n, rng)
+        tBuild, grid = timeit(shapes.ShapeGrid, circles)
+        objs = circles.to_shapes() if n <= PY_SCAN_MAX else None
+        pts = rng.uniform(0, side, (N_QUERIES, 2))
+        # boxes[:, 0] is (xMin, xMax), boxes[:, 1] is (yMin, yMax)
+        boxes = rng.uniform(0, side, (N_QUERIES, 2, 2))
+        boxes[:, :, 1] = boxes[:, :, 0] + side / 100
+
+        def grid_point():
+            return [grid.query_point(x, y) for x, y in pts]
+        def numpy_point():
+            return [np.flatnonzero(circles.contains(x, y)) for x, y in pts]
+        def python_point():
+            return [[j for j, s in enumerate(objs) if s.contains(x, y)] for x, y in pts[:10]]
+
+        def grid_box():
+            return [grid.query_box(*b[0], *b[1]) for b in boxes]
+        def numpy_box():
+            return [np.flatnonzero(circles.in_box(*b[0], *b[1])) for b in boxes]
+        def python_box():
+            out = []
+            for b in boxes[:10]:
+                xMin, xMax, yMin, yMax = *b[0], *b[1]
+                out.append([j for j, s in enumerate(objs)
+                            if s.x - s.r <= xMax and s.x + s.r >= xMin
+                            and s.y - s.r <= yMax and s.y + s.r >= yMin])
+            return out
+
+        def grid_knn():
+            return [grid.query_nearest(x, y, k=8) for x, y in pts]
+        def numpy_knn():
+            return [np.argpartition(np.hypot(circles.x - x, circles.y - y), 8)[:8]
+                    for x, y in pts]
+        def python_knn():
+            return [sorted(range(n), key=lambda j: np.hypot(objs[j].x - x, objs[j].y - y))[:8]
+                    for x, y in pts[:10]]
+
+        print(f"{n:>9} {'build':>8} {tBuild*1e6:>11.0f}")
+        for name, fGrid, fNumpy, fPython in (("point", grid_point, numpy_point, python_point),
+                                             ("box", grid_box, numpy_box, python_box),
+                                             ("knn", grid_knn, numpy_knn, python_knn)):
+            tg, _ = timeit(fGrid)
+            tn, _ = timeit(fNumpy)
+            line = f"{n:>9} {name:>8} {tg/N_QUERIES*1e6:>11.1f} {tn/N_QUERIES*1e6:>11.1f}"
+            if objs is not None and (n <= 10**4 or name != "knn"):
+                tp, _ = timeit(fPython)
+                line += f" {tp/10*1e6:>12.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark runner
+
+Runs the asv-style benchmark classes in the `suite_*` modules headless
+and appends one JSON record per benchmark and parameter set to a results
+file, tagged with the git commit, so throughput can be tracked over time.
+
+run from the repository root:
+    python -m benchmarks.run [-k pattern] [-o results.jsonl] [--repeat 5]
+"""
+
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+SUITES = ["benchmarks.suite_shapes"]
+
+
+def get_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import numpy, matplotlib
+    return {"commit": commit,
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "machine": platform.machine(),
+            "node": platform.node()}
+
+
+def collect(suites, pattern=None):
+    """ yield (name, class, method name, params) for every benchmark """
+    for modName in suites:
+        module = importlib.import_module(modName)
+        for clsName, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            grid = list(itertools.product(*getattr(cls, "params", [])))
+            for method in sorted(m for m in vars(cls) if m.startswith("time_")):
+                name = f"{modName.split('.')[-1]}.{clsName}.{method}"
+                if pattern and pattern not in name:
+                    continue
+                for params in grid:
+                    yield name, cls, method, params
+
+
+def run_one(cls, method, params, repeat):
+    bench = cls()
+    if hasattr(bench, "setup"):
+        bench.setup(*params)
+    try:
+        func = getattr(bench, method)
+        timer = timeit.Timer(lambda: func(*params))
+        number, _ = timer.autorange()
+        times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    finally:
+        if hasattr(bench, "teardown"):
+            bench.teardown(*params)
+    return number, times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", dest="pattern", default=None,
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("-o", dest="output", default="benchmarks/results.jsonl")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    meta = get_metadata()
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "a") as f:
+        for name, cls, method, params in collect(SUITES, args.pattern):
+            number, times = run_one(cls, method, params, args.repeat)
+            record = {"name": name,
+                      "params": dict(zip(getattr(cls, "param_names", []), params)),
+                      "number": number,
+                      "min": min(times),
+                      "median": statistics.median(times),
+                      "times": times,
+                      **meta}
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            label = ", ".join(map(str, params))
+            print(f"{name:<50} [{label}]".ljust(80) + f"{record['median']*1e6:12.2f} us")
+    print(f"results appended to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+benchmark suite: shapes
+
+asv-style benchmark classes, collected by `benchmarks.run`: each class
+has `params`/`param_names`, an optional `setup(*params)`, and `time_*`
+methods that are timed per parameter combination.
+"""
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import shapes
+import shapes.graphics
+
+
+SIZES = [10**3, 10**4, 10**5]
+KINDS = ["circle", "square", "rectangle"]
+CONSTRUCTORS = {"circle": (shapes.Circle, (0.5, -0.5, 1.2)),
+                "square": (shapes.Square, (0.5, -0.5, 1.2)),
+                "rectangle": (shapes.Rectangle, (0.5, -0.5, 1.2, 2.0))}
+
+
+def make_shapes(kind, n, seed=0):
+    """ `n` shapes spread over a square, at the same density for every `n` """
+    rng = np.random.default_rng(seed)
+    half = np.sqrt(n)
+    x, y = rng.uniform(-half, half, (2, n))
+    w, h = rng.uniform(0.1, 2, (2, n))
+    if kind == "circle":
+        return [shapes.Circle(*v) for v in zip(x.tolist(), y.tolist(), w.tolist())]
+    if kind == "square":
+        return [shapes.Square(*v) for v in zip(x.tolist(), y.tolist(), w.tolist())]
+    return [shapes.Rectangle(*v) for v in zip(x.tolist(), y.tolist(), w.tolist(), h.tolist())]
+
+
+class SingleShape():
+    """ per-object methods, one shape of each kind """
+    params = [KINDS]
+    param_names = ["kind"]
+
+    def setup(self, kind):
+        self.cls, self.args = CONSTRUCTORS[kind]
+        self.s = self.cls(*self.args)
+
+    def time_construct(self, kind):
+        self.cls(*self.args)
+
+    def time_translate(self, kind):
+        self.s.translate(0.1, -0.1)
+
+    def time_get_area(self, kind):
+        self.s.get_area()
+
+    def time_get_draw_coords_cached(self, kind):
+        self.s.get_draw_coords()
+
+    def time_get_draw_coords_moved(self, kind):
+        self.s.translate(0.1, -0.1)
+        self.s.get_draw_coords()
+
+    def time_get_draw_coords_tol(self, kind):
+        self.s.translate(0.1, -0.1)
+        self.s.get_draw_coords(tol=0.01)
+
+
+class PlotShape():
+    """ ShapeAxes.plot_shape plus a full Agg draw of the figure """
+    params = [KINDS]
+    param_names = ["kind"]
+
+    def setup(self, kind):
+        cls, args = CONSTRUCTORS[kind]
+        self.s = cls(*args)
+        self.fig = plt.figure()
+
+    def teardown(self, kind):
+        plt.close(self.fig)
+
+    def time_plot_shape(self, kind):
+        self.fig.clf()
+        ax = self.fig.add_subplot(1, 1, 1, aspect="equal", projection="shape")
+        ax.plot_shape(self.s)
+        self.fig.canvas.draw()
+
+
+class ShapeLists():
+    """ loops over lists of shape objects """
+    params = [KINDS, SIZES]
+    param_names = ["kind", "n"]
+
+    def setup(self, kind, n):
+        self.shapes = make_shapes(kind, n)
+
+    def time_construct(self, kind, n):
+        make_shapes(kind, n)
+
+    def time_translate(self, kind, n):
+        for s in self.shapes:
+            s.translate(0.1, -0.1)
+
+    def time_get_area(self, kind, n):
+        [s.get_area() for s in self.shapes]
+
+
+class Collections():
+    """ collection-scale operations on ShapeArray """
+    params = [["circle", "rectangle"], SIZES]
+    param_names = ["kind", "n"]
+
+    def setup(self, kind, n):
+        self.objs = make_shapes(kind, n)
+        self.arr = shapes.as_shape_array(self.objs)
+        # same shapes moved onto an image just covering them
+        half = int(np.sqrt(n)) + 2
+        self.pixels = self.arr.copy()
+        self.pixels.translate(half, half)
+        self.imageShape = (2*half, 2*half)
+        self.fig = plt.figure()
+
+    def teardown(self, kind, n):
+        plt.close(self.fig)
+
+    def time_from_shapes(self, kind, n):
+        shapes.as_shape_array(self.objs)
+
+    def time_translate(self, kind, n):
+        self.arr.translate(0.1, -0.1)
+
+    def time_get_area(self, kind, n):
+        self.arr.get_area()
+
+    def time_get_bounds(self, kind, n):
+        self.arr.get_bounds()
+
+    def time_get_draw_coords(self, kind, n):
+        self.arr.get_draw_coords(tol=0.01)
+
+    def time_shape_grid(self, kind, n):
+        shapes.ShapeGrid(self.arr)
+
+    def time_find_overlaps(self, kind, n):
+        shapes.find_overlaps(self.arr)
+
+    def time_rasterize(self, kind, n):
+        shapes.rasterize(self.pixels, self.imageShape)
+
+    def time_plot_shapes(self, kind, n):
+        self.fig.clf()
+        ax = self.fig.add_subplot(1, 1, 1, aspect="equal", projection="shape")
+        ax.plot_shapes(self.arr)
+        self.fig.canvas.draw()
@@ -2,20 +2,94 @@
 """
 @author: Raymond F. Pauszek III, Ph.D. (2020)
 package: shapes
+
+Drawing lives in shapes.graphics, which imports matplotlib and registers
+the "shape" projection. Import it (or access `shapes.graphics`) before
+creating axes with projection="shape":
+
+    import shapes.graphics
+    ax = plt.subplot(aspect="equal", projection="shape")
 """
 
+import numpy as np
+
+
 class Shape():
+    __slots__ = ("_x", "_y", "_coords")
+    # unit outline as (2, N) array; scaled and shifted for each instance
+    _template = np.zeros((2, 1))
 
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        self._x = x
+        self._y = y
+        self._coords = None
+
+    @property
+    def x(self):
+        return self._x
+    @x.setter
+    def x(self, val):
+        self._x = val
+        self._coords = None
+
+    @property
+    def y(self):
+        return self._y
+    @y.setter
+    def y(self, val):
+        self._y = val
+        self._coords = None
 
     def translate(self, dx=0, dy=0):
         self.x += dx
         self.y += dy
 
+    def get_bounds(self):
+        """ bounding box as (xMin, xMax, yMin, yMax) """
+        return self.x, self.x, self.y, self.y
+
+    def contains(self, x, y):
+        return x == self.x and y == self.y
+
+    def _get_scale(self):
+        return 1, 1
+
+    def _get_template(self, tol=None):
+        return self._template
+
+    def _outline(self, tol=None):
+        sx, sy = self._get_scale()
+        template = self._get_template(tol)
+        xy = template * np.array([[sx], [sy]]) + np.array([[self.x], [self.y]])
+        xy.flags.writeable = False
+        return xy[0], xy[1]
+
+    def get_draw_coords(self, tol=None):
+        """ outline coordinates, cached until the shape is changed
+
+        `tol` is the largest allowed distance between the drawn outline
+        and the true shape, in data units; None draws at full resolution.
+        """
+        template = self._get_template(tol)
+        if self._coords is None or self._coords[0] is not template:
+            self._coords = template, self._outline(tol)
+        return self._coords[1]
+
 
 
-import shapes.graphics
 from shapes.round_things import *
 from shapes.not_round_things import *
+from shapes.many_things import *
+from shapes.spatial import *
+from shapes.overlaps import *
+from shapes.raster import *
+
+
+def __getattr__(name):
+    # graphics pulls in matplotlib, so it is only imported (and the "shape"
+    # projection registered) on first use
+    if name == "graphics":
+        import shapes.graphics
+        return shapes.graphics
+    raise AttributeError(f"module 'shapes' has no attribute '{name}'")
+
@@ -4,25 +4,107 @@
 shapes >> graphics
 """
 
+import numpy as np
 import matplotlib as mpl
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
+from matplotlib.projections import register_projection
 
 
 gray = "#bbbbbb"
 
-class ShapeAxes(mpl.axes.Axes):
+
+def get_segments(shapes, tol=None):
+    """ outlines of `shapes` as a list (or array) of (M, 2) vertex arrays """
+    if hasattr(shapes, "get_draw_coords"):
+        x, y = shapes.get_draw_coords(tol=tol)
+        return np.stack((x, y), axis=-1)
+    return [np.column_stack(s.get_draw_coords(tol=tol)) for s in shapes]
+
+
+class ShapeCollection(LineCollection):
+    """ outlines of many shapes drawn as a single artist """
+
+    def __init__(self, shapes, tol=None, **kwargs):
+        self._tol = tol
+        super().__init__(get_segments(shapes, tol), **kwargs)
+
+    def set_shapes(self, shapes, tol=None):
+        """ update outlines in place, eg. after shapes were moved """
+        if tol is not None:
+            self._tol = tol
+        self.set_segments(get_segments(shapes, self._tol))
+
+
+class ShapeAxes(Axes):
+    """ axes for shapes, with guides through the origin
+
+    Both `plot_shape` and `plot_shapes` show at least (-10, 10) on each
+    axis and grow the view to hold every shape drawn so far, so the
+    limits do not depend on the order of the calls.
+    """
     name = "shape"
+    minLimits = (-10, 10)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._guides = None
+
+    def _draw_guides(self):
+        if self._guides is None:
+            self._guides = (self.axhline(0, c=gray, lw=0.5, ls=":"),
+                            self.axvline(0, c=gray, lw=0.5, ls=":"))
+
+    def get_tolerance(self, px=0.5):
+        """ data-space distance covered by `px` display pixels """
+        (x0, y0), (x1, y1) = self.transData.transform([(0, 0), (1, 1)])
+        pxPerUnit = max(abs(x1 - x0), abs(y1 - y0))
+        return px / pxPerUnit
+
+    def _fit_view(self):
+        lo, hi = self.minLimits
+        (x0, y0), (x1, y1) = self.dataLim.get_points()
+        self.set_xlim(min(x0, lo), max(x1, hi))
+        self.set_ylim(min(y0, lo), max(y1, hi))
+
+    def plot_shape(self, s, tol=None, **kwargs):
+        # coarsest outline still touches the exact bounding box
+        self.update_datalim(np.column_stack(s.get_draw_coords(tol=np.inf)))
+        self._fit_view()
+        self._draw_guides()
+
+        if tol is None:
+            tol = self.get_tolerance()
+        super().plot(*s.get_draw_coords(tol=tol), **kwargs)
+
+    def plot_shapes(self, shapes, tol=None, **kwargs):
+        """ draw any number of shapes (iterable or ShapeArray) as one artist
+
+        Colors cycle per shape unless `colors` is given; other keyword
+        arguments are passed to the LineCollection. Limits are set as by
+        `plot_shape`.
+        Returns the ShapeCollection, which can be updated with `set_shapes`.
+        """
+        if not hasattr(shapes, "get_draw_coords"):
+            shapes = list(shapes)
+        if "colors" not in kwargs and "color" not in kwargs:
+            cycle = mpl.rcParams["axes.prop_cycle"].by_key()["color"]
+            kwargs["colors"] = [cycle[j % len(cycle)] for j in range(len(shapes))]
+        self._draw_guides()
 
-    def plot_shape(self, s, **kwargs):
-        self.set_xlim(-10, 10)
-        self.set_ylim(-10, 10)
-        self.axhline(0, c=gray, lw=0.5, ls=":")
-        self.axvline(0, c=gray, lw=0.5, ls=":")
+        # coarsest outlines still touch the exact bounding boxes
+        coll = ShapeCollection(shapes, tol=np.inf, **kwargs)
+        self.add_collection(coll, autolim=True)
+        self._fit_view()
+        if tol is None:
+            tol = self.get_tolerance()
+        coll.set_shapes(shapes, tol=tol)
+        return coll
 
-        super().plot(*s.get_draw_coords(), **kwargs)
 
 
+def register():
+    """ make the "shape" projection available to matplotlib """
+    register_projection(ShapeAxes)
 
-mpl.projections.register_projection(ShapeAxes)
+register()
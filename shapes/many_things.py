@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shapes >> many_things
+"""
+
+import numpy as np
+
+from shapes import Shape
+from shapes.round_things import Circle, n_circle_vertices, _unit_circle
+from shapes.not_round_things import Rectangle
+
+
+__all__ = ["ShapeArray", "CircleArray", "RectangleArray", "as_shape_array"]
+
+
+class ShapeArray():
+    """ collection of shapes stored as one contiguous array per attribute
+
+    Geometry is computed with single vectorized calls over the whole
+    collection instead of one Python call per shape object.
+    """
+    _fields = ("x", "y")
+    _shape_type = Shape
+
+    def __init__(self, x=(), y=()):
+        self._x = np.array(x, dtype=float).ravel()
+        self._y = np.array(y, dtype=float).ravel()
+        self._check_lengths()
+
+    def _check_lengths(self):
+        n = [getattr(self, "_" + f).size for f in self._fields]
+        if len(set(n)) > 1:
+            raise ValueError(f"field lengths differ: {dict(zip(self._fields, n))}")
+
+    @property
+    def x(self):
+        return self._x
+    @x.setter
+    def x(self, val):
+        self._x[:] = val
+
+    @property
+    def y(self):
+        return self._y
+    @y.setter
+    def y(self, val):
+        self._y[:] = val
+
+    def __len__(self):
+        return self._x.size
+
+    def __str__(self):
+        return f"{self.__class__.__name__} [{len(self)} shapes]"
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("shape index out of range")
+            return self._view_type(self, int(index))
+        return self.__class__(**{f: getattr(self, "_" + f)[index] for f in self._fields})
+
+    def __iter__(self):
+        for j in range(len(self)):
+            yield self._view_type(self, j)
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        shapes = list(shapes)
+        return cls(**{f: [getattr(s, f) for s in shapes] for f in cls._fields})
+
+    def to_shapes(self):
+        cols = [getattr(self, "_" + f).tolist() for f in self._fields]
+        return [self._shape_type(*vals) for vals in zip(*cols)]
+
+    def copy(self):
+        return self[:]
+
+    def filter(self, mask):
+        """ return new collection of shapes where boolean `mask` is True """
+        return self[np.asarray(mask, dtype=bool)]
+
+    def translate(self, dx=0, dy=0):
+        """ `dx`, `dy` can be scalars or arrays with one value per shape """
+        self._x += dx
+        self._y += dy
+
+    def _get_scale(self):
+        return np.ones(len(self)), np.ones(len(self))
+
+    def _get_template(self, tol=None):
+        return self._shape_type._template
+
+    def get_draw_coords(self, tol=None):
+        """ outlines as (N, M) arrays of x and y, one row per shape """
+        sx, sy = self._get_scale()
+        template = self._get_template(tol)
+        x = self._x[:, None] + sx[:, None]*template[0]
+        y = self._y[:, None] + sy[:, None]*template[1]
+        return x, y
+
+    def get_bounds(self):
+        """ bounding boxes as arrays (xMin, xMax, yMin, yMax) """
+        return self._x, self._x, self._y, self._y
+
+    def get_area(self):
+        return np.zeros(len(self))
+
+    def get_perimeter(self):
+        return np.zeros(len(self))
+
+    def contains(self, x, y):
+        """ boolean mask of shapes containing point (`x`, `y`) """
+        xMin, xMax, yMin, yMax = self.get_bounds()
+        return (xMin <= x) & (x <= xMax) & (yMin <= y) & (y <= yMax)
+
+    def in_box(self, xMin, xMax, yMin, yMax):
+        """ boolean mask of shapes whose bounding box overlaps the box """
+        x1, x2, y1, y2 = self.get_bounds()
+        return (x1 <= xMax) & (x2 >= xMin) & (y1 <= yMax) & (y2 >= yMin)
+
+
+class CircleArray(ShapeArray):
+    _fields = ("x", "y", "r")
+    _shape_type = Circle
+
+    def __init__(self, x=(), y=(), r=()):
+        self._r = np.array(r, dtype=float).ravel()
+        super().__init__(x=x, y=y)
+
+    @property
+    def r(self):
+        return self._r
+    @r.setter
+    def r(self, val):
+        self._r[:] = val
+
+    @property
+    def D(self):
+        return 2*self._r
+
+    @property
+    def C(self):
+        return 2*np.pi*self._r
+
+    def _get_scale(self):
+        return self._r, self._r
+
+    def _get_template(self, tol=None):
+        if tol is None or len(self) == 0:
+            return Circle._template
+        # one vertex count for all, fine enough for the largest circle
+        return _unit_circle(n_circle_vertices(self._r.max(), tol) + 1)
+
+    def get_bounds(self):
+        return self._x - self._r, self._x + self._r, self._y - self._r, self._y + self._r
+
+    def get_area(self):
+        return np.pi * self._r**2
+
+    def get_perimeter(self):
+        return self.C
+
+    def contains(self, x, y):
+        return (self._x - x)**2 + (self._y - y)**2 <= self._r**2
+
+
+class RectangleArray(ShapeArray):
+    """ collection of axis-aligned rectangles; squares are stored with w == h """
+    _fields = ("x", "y", "w", "h")
+    _shape_type = Rectangle
+
+    def __init__(self, x=(), y=(), w=(), h=()):
+        self._w = np.array(w, dtype=float).ravel()
+        self._h = np.array(h, dtype=float).ravel()
+        super().__init__(x=x, y=y)
+
+    @property
+    def w(self):
+        return self._w
+    @w.setter
+    def w(self, val):
+        self._w[:] = val
+
+    @property
+    def h(self):
+        return self._h
+    @h.setter
+    def h(self, val):
+        self._h[:] = val
+
+    def _get_scale(self):
+        return self._w, self._h
+
+    def get_bounds(self):
+        hw = self._w/2
+        hh = self._h/2
+        return self._x - hw, self._x + hw, self._y - hh, self._y + hh
+
+    def get_area(self):
+        return self._w * self._h
+
+    def get_perimeter(self):
+        return 2*(self._w + self._h)
+
+
+def as_shape_array(shapes):
+    """ ShapeArray for a collection of one kind of shape
+
+    Shapes are matched by their attributes, so any circle-like objects
+    (x, y, r), eg. puncta.Circle, or rectangle-like objects (x, y, w, h)
+    are accepted.
+    """
+    if isinstance(shapes, ShapeArray):
+        return shapes
+    shapes = list(shapes)
+    if all(hasattr(s, "r") for s in shapes):
+        return CircleArray.from_shapes(shapes)
+    if all(hasattr(s, "w") and hasattr(s, "h") for s in shapes):
+        return RectangleArray.from_shapes(shapes)
+    raise TypeError("expected a collection of only circles or only rectangles")
+
+
+# ==============================================================================
+# element views
+# ==============================================================================
+def _positive_setter(name):
+    def fset(self, val):
+        try:
+            if val > 0:
+                getattr(self._parent, "_" + name)[self._index] = val
+        except TypeError:
+            print("invalid type, attribute not updated")
+    return fset
+
+
+class _ElementView():
+    """ proxy for a single element of a ShapeArray
+
+    Acts like the corresponding shape class, but reads and writes
+    its attributes directly in the parent collection's arrays.
+    Subclasses declare the (_parent, _index) slots themselves so that
+    they can combine with the slotted shape classes.
+    """
+    __slots__ = ()
+
+    def __init__(self, parent, index):
+        self._parent = parent
+        self._index = index
+
+    @property
+    def x(self):
+        return self._parent._x[self._index]
+    @x.setter
+    def x(self, val):
+        self._parent._x[self._index] = val
+
+    @property
+    def y(self):
+        return self._parent._y[self._index]
+    @y.setter
+    def y(self, val):
+        self._parent._y[self._index] = val
+
+    def get_draw_coords(self, tol=None):
+        # never cached; the parent arrays can change underneath the view
+        return self._outline(tol)
+
+    def __repr__(self):
+        vals = ", ".join(f"{f}={getattr(self, f):g}" for f in self._parent._fields)
+        return f"{self.__class__.__name__}({vals})"
+
+
+class ShapeView(_ElementView, Shape):
+    __slots__ = ("_parent", "_index")
+
+
+class CircleView(_ElementView, Circle):
+    __slots__ = ("_parent", "_index")
+    r = property(lambda self: self._parent._r[self._index], _positive_setter("r"))
+
+
+class RectangleView(_ElementView, Rectangle):
+    __slots__ = ("_parent", "_index")
+    w = property(lambda self: self._parent._w[self._index], _positive_setter("w"))
+    h = property(lambda self: self._parent._h[self._index], _positive_setter("h"))
+
+
+ShapeArray._view_type = ShapeView
+CircleArray._view_type = CircleView
+RectangleArray._view_type = RectangleView
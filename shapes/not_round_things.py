@@ -5,7 +5,6 @@ shapes >> not_round_things
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 from shapes import Shape
 
@@ -14,6 +13,10 @@ __all__ = ["Square", "Rectangle"]
 
 
 class Square(Shape):
+    __slots__ = ("_w",)
+    # corners of unit square, traced from lower left
+    _template = np.array([[-0.5, -0.5, 0.5,  0.5, -0.5],
+                          [-0.5,  0.5, 0.5, -0.5, -0.5]])
 
     def __init__(self, x, y, w):
         super().__init__(x=x, y=y)
@@ -27,6 +30,7 @@ class Square(Shape):
         try:
             if val > 0:
                 self._w = val
+                self._coords = None
         except TypeError:
             print("invalid type, attribute not updated")
 
@@ -37,23 +41,19 @@ class Square(Shape):
     def get_area(self):
         return self.w * self.h
 
-    def get_draw_coords(self):
-        xMin, xMax = self.x + (np.array([-1, 1]) * (self.w/2))
-        yMin, yMax = self.y + (np.array([-1, 1]) * (self.h/2))
+    def get_bounds(self):
+        return (self.x - self.w/2, self.x + self.w/2,
+                self.y - self.h/2, self.y + self.h/2)
 
-        N = 100
-        xRange = np.linspace(xMin, xMax, N)
-        yRange = np.linspace(yMin, yMax, N)
+    def contains(self, x, y):
+        return abs(x - self.x) <= self.w/2 and abs(y - self.y) <= self.h/2
 
-        leftVert = np.vstack((np.ones(N)*xMin, yRange)).T
-        topHorz = np.vstack((xRange, np.ones(N)*yMax)).T
-        rightVert = np.vstack((np.ones(N)*xMax, yRange[::-1])).T
-        botHorz = np.vstack((xRange[::-1], np.ones(N)*yMin)).T
-        x, y = np.vstack((leftVert, topHorz, rightVert, botHorz)).T
-        return x, y
+    def _get_scale(self):
+        return self.w, self.h
 
 
 class Rectangle(Square):
+    __slots__ = ("_h",)
 
     def __init__(self, x, y, w, h):
         super().__init__(x=x, y=y, w=w)
@@ -67,5 +67,6 @@ class Rectangle(Square):
         try:
             if val > 0:
                 self._h = val
+                self._coords = None
         except TypeError:
             print("invalid type, attribute not updated")
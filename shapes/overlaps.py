@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shapes >> overlaps
+"""
+
+import numpy as np
+
+from shapes.many_things import CircleArray, RectangleArray, as_shape_array
+from shapes.spatial import fit_grid, cell_index, bin_bounds
+
+
+__all__ = ["find_overlaps"]
+
+
+def find_overlaps(a, b=None, method="grid", blockSize=2**20):
+    """ overlapping pairs of shapes and their intersection areas
+
+    `a` and `b` are CircleArray/RectangleArray (or collections of one
+    kind of shape, see `as_shape_array`). With `b` None, pairs within `a` are found (i < j).
+    `method` is "grid" (pairs sharing a uniform grid cell), "sweep"
+    (sweep-and-prune along one axis) or "brute" (all pairs); all of them
+    broadcast in blocks of about `blockSize` candidate pairs.
+
+    Returns (i, j, area): indices into `a` and `b`, sorted by (i, j),
+    and the area of each intersection.
+    """
+    a = as_shape_array(a)
+    same = b is None
+    b = a if same else as_shape_array(b)
+
+    if method == "grid":
+        blocks = _orient(_grid_pairs(_joint_bounds(a, b, same), blockSize), len(a), same)
+    elif method == "sweep":
+        blocks = _orient(_sweep_pairs(_joint_bounds(a, b, same), blockSize), len(a), same)
+    elif method == "brute":
+        blocks = _brute_pairs(a, b, same, blockSize)
+    else:
+        raise ValueError(f"unknown method '{method}'")
+
+    area = _area_function(a, b)
+    boundsA = np.array(a.get_bounds()).reshape(4, -1)
+    boundsB = boundsA if same else np.array(b.get_bounds()).reshape(4, -1)
+    I, J, A = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0)]
+    for i, j in blocks:
+        # bounding boxes first, exact geometry only for survivors
+        keep = _bounds_overlap(boundsA[:, i], boundsB[:, j])
+        i, j = i[keep], j[keep]
+        ar = area(a, i, b, j)
+        keep = ar > 0
+        I.append(i[keep])
+        J.append(j[keep])
+        A.append(ar[keep])
+    I, J, A = np.concatenate(I), np.concatenate(J), np.concatenate(A)
+    order = np.lexsort((J, I))
+    return I[order], J[order], A[order]
+
+
+def _bounds_overlap(boundsA, boundsB):
+    ax1, ax2, ay1, ay2 = boundsA
+    bx1, bx2, by1, by2 = boundsB
+    return (ax1 < bx2) & (bx1 < ax2) & (ay1 < by2) & (by1 < ay2)
+
+
+# ==============================================================================
+# broad phase
+# ==============================================================================
+def _chunks(counts, blockSize):
+    """ split rows into consecutive runs of about `blockSize` total pairs """
+    ends = np.cumsum(counts)
+    start = 0
+    while start < counts.size:
+        limit = (ends[start - 1] if start else 0) + blockSize
+        stop = max(np.searchsorted(ends, limit, side="right"), start + 1)
+        yield start, stop
+        start = stop
+
+
+def _brute_pairs(a, b, same, blockSize):
+    n, m = len(a), len(b)
+    rows = max(1, blockSize // max(m, 1))
+    for start in range(0, n, rows):
+        i = np.arange(start, min(start + rows, n))
+        I, J = np.meshgrid(i, np.arange(m), indexing="ij")
+        if same:
+            keep = J > I
+            yield I[keep], J[keep]
+        else:
+            yield I.ravel(), J.ravel()
+
+
+def _joint_bounds(a, b, same):
+    """ bounding boxes (4, N) of `a`, followed by those of `b` unless `same` """
+    if same:
+        return np.array(a.get_bounds()).reshape(4, -1)
+    return np.hstack((np.array(a.get_bounds()).reshape(4, -1),
+                      np.array(b.get_bounds()).reshape(4, -1)))
+
+
+def _orient(blocks, nA, same):
+    """ map pairs of joint indices to (index in a, index in b) """
+    for p, q in blocks:
+        if same:
+            yield np.minimum(p, q), np.maximum(p, q)
+        else:
+            cross = (p < nA) != (q < nA)
+            p, q = p[cross], q[cross]
+            yield np.where(p < nA, p, q), np.where(p < nA, q, p) - nA
+
+
+def _expand(counts, start, stop):
+    """ positions (p, q) pairing each row p with the `counts[p]` rows after it """
+    c = counts[start:stop]
+    p = np.repeat(np.arange(start, stop), c)
+    q = p + 1 + np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+    return p, q
+
+
+def _grid_pairs(bounds, blockSize):
+    """ candidate pairs of boxes registered in the same grid cell
+
+    A pair sharing several cells is only reported from the cell holding
+    the lower-left corner of the overlap of the two boxes.
+    """
+    x0, y0, cellSize, nx, ny = grid = fit_grid(bounds)
+    idx, keys = bin_bounds(bounds, grid)
+    order = np.argsort(keys, kind="stable")
+    idx, keys = idx[order], keys[order]
+    counts = np.searchsorted(keys, keys, side="right") - np.arange(keys.size) - 1
+
+    for start, stop in _chunks(counts, blockSize):
+        p, q = _expand(counts, start, stop)
+        i, j = idx[p], idx[q]
+        cx = np.maximum(bounds[0, i], bounds[0, j])
+        cy = np.maximum(bounds[2, i], bounds[2, j])
+        ref = cell_index(cx, x0, cellSize, nx)*ny + cell_index(cy, y0, cellSize, ny)
+        keep = ref == keys[p]
+        yield i[keep], j[keep]
+
+
+def _sweep_pairs(bounds, blockSize):
+    """ sweep-and-prune: candidate pairs whose extents overlap along one axis
+
+    Boxes are sorted by their lower edge; each one is paired with the
+    boxes whose lower edges fall within its own extent.
+    """
+    x1, x2, y1, y2 = bounds
+    lo, hi = x1, x2
+    if x1.size:
+        # sweep along the axis where boxes are most spread out relative to size
+        xSpread = (x2.max() - x1.min()) / max(np.mean(x2 - x1), 1e-12)
+        ySpread = (y2.max() - y1.min()) / max(np.mean(y2 - y1), 1e-12)
+        if ySpread > xSpread:
+            lo, hi = y1, y2
+    order = np.argsort(lo, kind="stable")
+    lo, hi = lo[order], hi[order]
+    counts = np.maximum(np.searchsorted(lo, hi, side="right") - np.arange(lo.size) - 1, 0)
+
+    for start, stop in _chunks(counts, blockSize):
+        p, q = _expand(counts, start, stop)
+        yield order[p], order[q]
+
+
+# ==============================================================================
+# narrow phase: exact intersection areas
+# ==============================================================================
+def _area_function(a, b):
+    kinds = (type(a), type(b))
+    if kinds == (CircleArray, CircleArray):
+        return _circle_circle
+    if kinds == (RectangleArray, RectangleArray):
+        return _rect_rect
+    if kinds == (CircleArray, RectangleArray):
+        return _circle_rect
+    if kinds == (RectangleArray, CircleArray):
+        return lambda a, i, b, j: _circle_rect(b, j, a, i)
+    raise TypeError(f"no overlap rule for {kinds[0].__name__} and {kinds[1].__name__}")
+
+
+def _circle_circle(a, i, b, j):
+    r1, r2 = a.r[i], b.r[j]
+    d = np.hypot(a.x[i] - b.x[j], a.y[i] - b.y[j])
+    area = np.zeros(d.size)
+
+    inside = d <= np.abs(r1 - r2)
+    area[inside] = np.pi * np.minimum(r1, r2)[inside]**2
+
+    lens = ~inside & (d < r1 + r2)
+    d, r1, r2 = d[lens], r1[lens], r2[lens]
+    c1 = np.clip((d**2 + r1**2 - r2**2) / (2*d*r1), -1, 1)
+    c2 = np.clip((d**2 + r2**2 - r1**2) / (2*d*r2), -1, 1)
+    k = (-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2)
+    area[lens] = r1**2*np.arccos(c1) + r2**2*np.arccos(c2) - 0.5*np.sqrt(np.maximum(k, 0))
+    return area
+
+
+def _rect_rect(a, i, b, j):
+    dx = np.abs(a.x[i] - b.x[j])
+    dy = np.abs(a.y[i] - b.y[j])
+    w = np.minimum((a.w[i] + b.w[j])/2 - dx, np.minimum(a.w[i], b.w[j]))
+    h = np.minimum((a.h[i] + b.h[j])/2 - dy, np.minimum(a.h[i], b.h[j]))
+    return np.clip(w, 0, None) * np.clip(h, 0, None)
+
+
+def _circle_rect(a, i, b, j):
+    """ circles in `a`, rectangles in `b` """
+    dx, dy = b.x[j] - a.x[i], b.y[j] - a.y[i]
+    return circle_box_area(a.r[i], dx - b.w[j]/2, dx + b.w[j]/2,
+                           dy - b.h[j]/2, dy + b.h[j]/2)
+
+
+def circle_box_area(r, xMin, xMax, yMin, yMax):
+    """ area of circle (radius `r` at origin) inside the box, elementwise
+
+    By inclusion-exclusion of the four quadrants cornered at the box corners.
+    """
+    return (_circle_corner(xMax, yMax, r) - _circle_corner(xMin, yMax, r)
+            - _circle_corner(xMax, yMin, r) + _circle_corner(xMin, yMin, r))
+
+
+def _circle_corner(x, y, r):
+    """ area of circle (radius `r` at origin) within u <= x, v <= y """
+    def F(u):
+        # antiderivative of sqrt(r**2 - u**2); zero for zero-radius circles
+        rr = np.where(r > 0, r, 1)
+        return 0.5*(u*np.sqrt(np.maximum(r**2 - u**2, 0)) + r**2*np.arcsin(np.clip(u/rr, -1, 1)))
+
+    x = np.clip(x, -r, r)
+    y = np.clip(y, -r, r)
+    a = np.sqrt(np.maximum(r**2 - y**2, 0))
+    m = np.clip(x, -a, a)
+    chord = F(m) - F(-a)
+    upper = 2*(F(x) - F(-r)) - chord + y*(m + a)
+    lower = chord + y*(m + a)
+    return np.where(y >= 0, upper, lower)
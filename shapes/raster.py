@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shapes >> raster
+"""
+
+import numpy as np
+
+from shapes.many_things import CircleArray, as_shape_array
+from shapes.overlaps import circle_box_area
+
+
+__all__ = ["rasterize"]
+
+
+def rasterize(shapes, imageShape, mode="mask", antialias=False, blockSize=2**22):
+    """ draw a collection of shapes into an image of `imageShape` (rows, cols)
+
+    Pixel (i, j) is centered on x=j, y=i, as shown by `imshow`. Only the
+    pixels within each shape's bounding box are evaluated, in blocks of
+    about `blockSize` pixels. Without `antialias` a pixel belongs to a
+    shape if its center is inside; with it, the fraction of the pixel
+    covered by the shape is used.
+
+    mode
+        "mask"   : union of all shapes, bool (float coverage with antialias)
+        "labels" : int image, shape k drawn as k+1 and 0 is background;
+                   where shapes overlap the higher label wins
+        "sparse" : list with (rows, cols) per shape ((rows, cols, coverage)
+                   with antialias)
+    """
+    shapes = as_shape_array(shapes)
+    nRows, nCols = imageShape
+    if mode == "mask":
+        out = np.zeros(imageShape, dtype=float if antialias else bool)
+    elif mode == "labels":
+        out = np.zeros(imageShape, dtype=np.int32 if len(shapes) < 2**31 - 1 else np.int64)
+    elif mode == "sparse":
+        parts = []
+    else:
+        raise ValueError(f"unknown mode '{mode}'")
+
+    # pixel ranges of the bounding boxes, clipped to the image
+    xMin, xMax, yMin, yMax = shapes.get_bounds()
+    j0 = np.clip(np.floor(xMin + 0.5), 0, nCols).astype(int)
+    j1 = np.clip(np.floor(xMax + 0.5) + 1, 0, nCols).astype(int)
+    i0 = np.clip(np.floor(yMin + 0.5), 0, nRows).astype(int)
+    i1 = np.clip(np.floor(yMax + 0.5) + 1, 0, nRows).astype(int)
+    nj = np.maximum(j1 - j0, 0)
+    counts = np.maximum(i1 - i0, 0) * nj
+    ends = np.cumsum(counts)
+
+    start = 0
+    while start < len(shapes):
+        # a run of shapes with about `blockSize` bounding-box pixels in total
+        limit = (ends[start - 1] if start else 0) + blockSize
+        stop = max(np.searchsorted(ends, limit, side="right"), start + 1)
+        c = counts[start:stop]
+        k = np.repeat(np.arange(start, stop), c)
+        offset = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+        rows = i0[k] + offset // nj[k]
+        cols = j0[k] + offset % nj[k]
+
+        value = _coverage(shapes, k, cols, rows) if antialias else _inside(shapes, k, cols, rows)
+        keep = value > 0
+        k, rows, cols, value = k[keep], rows[keep], cols[keep], value[keep]
+
+        if mode == "mask" and antialias:
+            np.maximum.at(out, (rows, cols), value)
+        elif mode == "mask":
+            out[rows, cols] = True
+        elif mode == "labels":
+            np.maximum.at(out, (rows, cols), k + 1)
+        else:
+            parts.append((k, rows, cols, value))
+        start = stop
+
+    if mode != "sparse":
+        return out
+    if not parts:
+        return []
+    k, rows, cols, value = (np.concatenate(v) for v in zip(*parts))
+    splits = np.searchsorted(k, np.arange(1, len(shapes)))
+    rows, cols = np.split(rows, splits), np.split(cols, splits)
+    if antialias:
+        return list(zip(rows, cols, np.split(value, splits)))
+    return list(zip(rows, cols))
+
+
+def _inside(shapes, k, px, py):
+    dx, dy = px - shapes.x[k], py - shapes.y[k]
+    if isinstance(shapes, CircleArray):
+        return dx**2 + dy**2 <= shapes.r[k]**2
+    return (np.abs(dx) <= shapes.w[k]/2) & (np.abs(dy) <= shapes.h[k]/2)
+
+
+def _coverage(shapes, k, px, py):
+    """ fraction of each unit pixel covered by its shape """
+    dx, dy = px - shapes.x[k], py - shapes.y[k]
+    if isinstance(shapes, CircleArray):
+        # exact areas only for pixels straddling the edge (half a diagonal away)
+        r = shapes.r[k]
+        d = np.hypot(dx, dy)
+        cov = (d <= r - np.sqrt(0.5)).astype(float)
+        edge = np.abs(d - r) < np.sqrt(0.5)
+        dx, dy, r = dx[edge], dy[edge], r[edge]
+        cov[edge] = circle_box_area(r, dx - 0.5, dx + 0.5, dy - 0.5, dy + 0.5)
+        return cov
+    hw, hh = shapes.w[k]/2, shapes.h[k]/2
+    w = np.minimum(dx + 0.5, hw) - np.maximum(dx - 0.5, -hw)
+    h = np.minimum(dy + 0.5, hh) - np.maximum(dy - 0.5, -hh)
+    return np.clip(w, 0, 1) * np.clip(h, 0, 1)
@@ -5,13 +5,29 @@ shapes >> round_things
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
+from functools import lru_cache
 
 from shapes import Shape
 
 __all__ = ["Circle"]
 
+
+def n_circle_vertices(r, tol, nMin=8, nMax=359):
+    """ fewest polygon segments keeping a circle outline within `tol` """
+    if tol >= r:
+        return nMin
+    n = int(np.ceil(np.pi / np.arccos(1 - tol/r)))
+    return min(max(n, nMin), nMax)
+
+@lru_cache(maxsize=None)
+def _unit_circle(n):
+    t = np.linspace(0, 2*np.pi, n)
+    return np.vstack((np.cos(t), np.sin(t)))
+
+
 class Circle(Shape):
+    __slots__ = ("_r",)
+    _template = _unit_circle(360)
 
     def __init__(self, x=0, y=0, r=1):
         super().__init__(x=x, y=y)
@@ -25,6 +41,7 @@ class Circle(Shape):
         try:
             if val > 0:
                 self._r = val
+                self._coords = None
         except TypeError:
             print("invalid type, attribute not updated")
 
@@ -39,8 +56,16 @@ class Circle(Shape):
     def get_area(self):
         return np.pi * self.r**2
 
-    def get_draw_coords(self):
-        t = np.linspace(0, 2*np.pi, 360)
-        x = self.x + self.r*np.cos(t)
-        y = self.y + self.r*np.sin(t)
-        return x, y
+    def get_bounds(self):
+        return self.x - self.r, self.x + self.r, self.y - self.r, self.y + self.r
+
+    def contains(self, x, y):
+        return (x - self.x)**2 + (y - self.y)**2 <= self.r**2
+
+    def _get_scale(self):
+        return self.r, self.r
+
+    def _get_template(self, tol=None):
+        if tol is None:
+            return self._template
+        return _unit_circle(n_circle_vertices(self.r, tol) + 1)
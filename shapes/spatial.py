@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shapes >> spatial
+"""
+
+import numpy as np
+
+from shapes.many_things import ShapeArray
+
+
+__all__ = ["ShapeGrid"]
+
+
+def fit_grid(bounds, cellSize=None):
+    """ grid (x0, y0, cellSize, nx, ny) covering bounding boxes (4, N) """
+    xMin, xMax, yMin, yMax = bounds
+    n = xMin.size
+    if n == 0:
+        return 0.0, 0.0, 1.0 if cellSize is None else float(cellSize), 1, 1
+    x0, y0 = xMin.min(), yMin.min()
+    width, height = xMax.max() - x0, yMax.max() - y0
+    if cellSize is None:
+        # about one shape per cell, but no smaller than a typical shape
+        typical = np.median(np.maximum(xMax - xMin, yMax - yMin))
+        cellSize = max(np.sqrt(width * height / n), typical)
+    if not cellSize > 0:
+        cellSize = 1.0
+    return x0, y0, float(cellSize), int(width // cellSize) + 1, int(height // cellSize) + 1
+
+def cell_index(v, v0, cellSize, n):
+    """ grid cell along one axis; positions off the grid go to the edge cells """
+    c = np.floor((np.asarray(v, dtype=float) - v0) / cellSize)
+    return np.clip(c, 0, n - 1).astype(int)
+
+def bin_bounds(bounds, grid):
+    """ (box index, cell key) pairs, one for every grid cell each box covers
+
+    Cell keys are i*ny + j for column i and row j of the grid.
+    """
+    xMin, xMax, yMin, yMax = bounds
+    x0, y0, cellSize, nx, ny = grid
+    i0, i1 = cell_index(xMin, x0, cellSize, nx), cell_index(xMax, x0, cellSize, nx)
+    j0, j1 = cell_index(yMin, y0, cellSize, ny), cell_index(yMax, y0, cellSize, ny)
+    nj = j1 - j0 + 1
+    counts = (i1 - i0 + 1) * nj
+    idx = np.repeat(np.arange(xMin.size), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    nj = nj[idx]
+    keys = (i0[idx] + k // nj) * ny + (j0[idx] + k % nj)
+    return idx, keys
+
+
+class ShapeGrid():
+    """ uniform grid index over the bounding boxes of a shape collection
+
+    Built in bulk from a list of shapes or a ShapeArray. Every shape is
+    registered in each grid cell its bounding box touches; shapes moved
+    afterwards are tracked separately with `update` until the next rebuild.
+    """
+    # rebuild once this fraction of shapes has moved since the last build
+    rebuildFraction = 0.01
+
+    def __init__(self, shapes, cellSize=None):
+        self._shapes = shapes
+        self._read_shapes()
+        self.build(cellSize)
+
+    def __len__(self):
+        return self._centers.shape[1]
+
+    def _read_shapes(self):
+        if isinstance(self._shapes, ShapeArray):
+            self._bounds = np.array(self._shapes.get_bounds(), dtype=float).reshape(4, -1)
+            self._centers = np.array((self._shapes.x, self._shapes.y), dtype=float)
+        else:
+            self._shapes = list(self._shapes)
+            self._bounds = np.array([s.get_bounds() for s in self._shapes],
+                                    dtype=float).reshape(-1, 4).T.copy()
+            self._centers = np.array([(s.x, s.y) for s in self._shapes],
+                                     dtype=float).reshape(-1, 2).T.copy()
+
+    def build(self, cellSize=None):
+        """ (re)build the grid from the current bounding boxes """
+        grid = fit_grid(self._bounds, cellSize)
+        self._x0, self._y0, self.cellSize, self._nx, self._ny = grid
+        idx, keys = bin_bounds(self._bounds, grid)
+
+        # compressed rows: shapes in cell `key` are order[starts[key]:starts[key+1]]
+        self._order = idx[np.argsort(keys, kind="stable")]
+        self._starts = np.zeros(self._nx * self._ny + 1, dtype=int)
+        np.cumsum(np.bincount(keys, minlength=self._nx * self._ny), out=self._starts[1:])
+
+        self._moved = np.zeros(len(self), dtype=bool)
+        self._movedIdx = set()
+
+    def refresh(self):
+        """ re-read all shapes, eg. after a vectorized ShapeArray.translate """
+        self._read_shapes()
+        self.build(self.cellSize)
+
+    def _cell_x(self, x):
+        return cell_index(x, self._x0, self.cellSize, self._nx)
+
+    def _cell_y(self, y):
+        return cell_index(y, self._y0, self.cellSize, self._ny)
+
+    def _candidates(self, i0, i1, j0, j1):
+        rows = [self._order[self._starts[i*self._ny + j0]:self._starts[i*self._ny + j1 + 1]]
+                for i in range(i0, i1+1)]
+        cand = np.concatenate(rows)
+        cand = cand[~self._moved[cand]]
+        if self._movedIdx:
+            cand = np.concatenate((cand, np.fromiter(self._movedIdx, dtype=int)))
+        return np.unique(cand)
+
+    # ==========================================================================
+    # updates
+    # ==========================================================================
+    def update(self, index):
+        """ re-register shape(s) at `index` after they were moved or resized """
+        for j in np.atleast_1d(index):
+            j = int(j)
+            s = self._shapes[j]
+            self._bounds[:, j] = s.get_bounds()
+            self._centers[:, j] = s.x, s.y
+            self._moved[j] = True
+            self._movedIdx.add(j)
+        if len(self._movedIdx) > max(64, self.rebuildFraction * len(self)):
+            self.build(self.cellSize)
+
+    def translate(self, index, dx=0, dy=0):
+        """ move shape at `index` and update the index """
+        self._shapes[index].translate(dx, dy)
+        self.update(index)
+
+    # ==========================================================================
+    # queries
+    # ==========================================================================
+    def query_point(self, x, y):
+        """ indices of shapes containing point (`x`, `y`) """
+        i, j = self._cell_x(x), self._cell_y(y)
+        cand = self._candidates(i, i, j, j)
+        xMin, xMax, yMin, yMax = self._bounds[:, cand]
+        cand = cand[(xMin <= x) & (x <= xMax) & (yMin <= y) & (y <= yMax)]
+        return np.array([c for c in cand if self._shapes[c].contains(x, y)], dtype=int)
+
+    def query_box(self, xMin, xMax, yMin, yMax):
+        """ indices of shapes whose bounding boxes overlap the box """
+        cand = self._candidates(self._cell_x(xMin), self._cell_x(xMax),
+                                self._cell_y(yMin), self._cell_y(yMax))
+        x1, x2, y1, y2 = self._bounds[:, cand]
+        return cand[(x1 <= xMax) & (x2 >= xMin) & (y1 <= yMax) & (y2 >= yMin)]
+
+    def query_nearest(self, x, y, k=1):
+        """ indices and distances of the `k` shapes with centers nearest (`x`, `y`)
+
+        Searches rings of grid cells outward until the k-th distance is
+        shorter than the distance to the edge of the searched region.
+        """
+        k = min(k, len(self))
+        ci, cj = self._cell_x(x), self._cell_y(y)
+        r = 0
+        while True:
+            i0, i1 = max(ci - r, 0), min(ci + r, self._nx - 1)
+            j0, j1 = max(cj - r, 0), min(cj + r, self._ny - 1)
+            cand = self._candidates(i0, i1, j0, j1)
+            d = np.hypot(self._centers[0, cand] - x, self._centers[1, cand] - y)
+            # region edges on the grid boundary extend to infinity (clipped cells)
+            edges = [np.inf]
+            if i0 > 0:
+                edges.append(x - (self._x0 + i0*self.cellSize))
+            if i1 < self._nx - 1:
+                edges.append(self._x0 + (i1 + 1)*self.cellSize - x)
+            if j0 > 0:
+                edges.append(y - (self._y0 + j0*self.cellSize))
+            if j1 < self._ny - 1:
+                edges.append(self._y0 + (j1 + 1)*self.cellSize - y)
+            if cand.size >= k:
+                nearest = np.argsort(d, kind="stable")[:k]
+                if k == 0 or d[nearest[-1]] <= min(edges):
+                    return cand[nearest], d[nearest]
+            r += 1
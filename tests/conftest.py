@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shared test setup: the packages are imported from the repository root,
+puncta from workshop, as the apps do
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "workshop"))
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_background import make_image
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    """ 512x512 uint16 image with 65 Gaussian puncta and their signal """
+    img, truth, bg = make_image(512)
+    return img, truth, 512**2 // 4000
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> background, intensity scale of the paraboloid engine
+"""
+import numpy as np
+import pytest
+
+from skimage import io
+
+from puncta import FOV
+from puncta.background import subtract_background, intensity_counts
+
+
+def test_intensity_counts():
+    assert intensity_counts(np.zeros(4, np.uint8)) == 255
+    assert intensity_counts(np.zeros(4, np.uint16)) == 65535
+    # floats carry no scale of their own
+    assert intensity_counts(np.full(4, 0.5, np.float32)) is None
+    assert intensity_counts(np.full(4, 800.0)) is None
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_paraboloid_scaled_float_matches_uint16(synthetic, dtype):
+    img = synthetic[0]
+    ref = subtract_background(img, "paraboloid")
+    res = subtract_background((img / 65535).astype(dtype), "paraboloid", dtype=dtype)
+    assert np.abs(res - ref).max() < 1e-5
+
+def test_paraboloid_in_counts_of_the_input(synthetic):
+    # an 8-bit image and the same counts as raw floats get the same ball
+    img = (synthetic[0] // 257).astype(np.uint8)
+    res8 = subtract_background(img, "paraboloid") * 255
+    resRaw = subtract_background(img.astype(float), "paraboloid", counts=1)
+    assert np.allclose(res8, resRaw, atol=1e-6)
+    # the 16-bit curvature would flatten the ball 257 times
+    res16 = subtract_background(img, "paraboloid", counts=65535) * 255
+    assert not np.allclose(res8, res16, atol=0.5)
+
+
+def test_fov_counts_from_source_dtype(synthetic, tmp_path):
+    # a color 8-bit file is read as gray floats that keep the 8-bit counts
+    gray = (synthetic[0] // 257).astype(np.uint8)
+    io.imsave(tmp_path / "rgb.tif", np.dstack([gray]*3), check_contrast=False)
+    fov = FOV.read_image(tmp_path / "rgb.tif")
+    assert fov._img.dtype == np.float64 and fov.counts == 255
+    fov.correct_background(method="paraboloid")
+    ref = subtract_background(gray, "paraboloid")
+    assert np.abs(fov.img - ref).max() < 1e-3
+
+    fov.save(tmp_path / "fov.hdf5")
+    assert FOV.load(tmp_path / "fov.hdf5").counts == 255
+    # integer files carry the counts in the raw image itself
+    io.imsave(tmp_path / "gray.tif", gray, check_contrast=False)
+    assert FOV.read_image(tmp_path / "gray.tif").counts is None
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_correction_leaves_earlier_arrays_alone(synthetic, dtype):
+    fov = FOV(synthetic[0], id_="test", dtype=dtype)
+    fov.correct_background(method="tophat")
+    fov.add_cell([100, 140, 200, 230])
+    first, view = fov.img, fov[0].img
+    before = view.copy()
+    fov.correct_background(method="paraboloid")
+    assert fov.img is not first and fov.img.dtype == dtype
+    np.testing.assert_array_equal(view, before)
+    assert not np.array_equal(fov[0].img, before)
+
+    # opt-in: the corrected image is reused and earlier views follow it
+    second = fov.img
+    fov.correct_background(method="tophat", inplace=True)
+    assert fov.img is second
+    np.testing.assert_array_equal(fov[0].img, before)
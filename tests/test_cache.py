@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> cache, a cache hit leaves cells as the fit did
+"""
+import h5py
+import numpy as np
+import pytest
+
+from puncta import FOV
+from puncta.cache import FitCache
+
+
+def detected(synthetic):
+    fov = FOV(synthetic[0], id_="test")
+    fov.correct_background(method="tophat")
+    fov.detect_puncta()
+    return fov
+
+def assert_same_state(cell, other):
+    assert cell.converged is other.converged
+    assert (cell.punctum is None) == (other.punctum is None)
+    if cell.punctum is not None:
+        p, q = cell.punctum, other.punctum
+        assert (p.x, p.y, p.r) == pytest.approx((q.x, q.y, q.r), abs=1e-9)
+
+@pytest.mark.parametrize("mode", ["zoom", "native", "centroid"])
+def test_hit_matches_miss(synthetic, tmp_path, mode):
+    missed, hit = detected(synthetic), detected(synthetic)
+    cells = [0, 2]
+    if mode != "zoom":
+        # no seed, and an empty crop that cannot converge
+        for fov in (missed, hit):
+            fov[1].punctum = None
+            fov[3].img[...] = 0
+        cells += [1, 3]
+
+    with FitCache(tmp_path / "cache.h5") as cache:
+        for i in cells:
+            missed[i].fit_punctum(isTesting=False, mode=mode, cache=cache)
+        assert cache.misses == len(cells) and cache.hits == 0
+    if mode == "zoom":
+        # zoom fits report no convergence, and a hit must not invent one
+        assert [missed[i].converged for i in cells] == [None, None]
+    else:
+        assert [missed[i].converged for i in cells] == [True, True, True, False]
+
+    # from disk, so the status survives a flush and load
+    cache = FitCache(tmp_path / "cache.h5")
+    for i in cells:
+        hit[i].fit_punctum(isTesting=False, mode=mode, cache=cache)
+        assert_same_state(hit[i], missed[i])
+    assert cache.hits == len(cells) and cache.misses == 0
+
+def test_batch_hit_matches_miss(synthetic):
+    missed, hit = detected(synthetic), detected(synthetic)
+    cache = FitCache()
+    first = missed.fit_all_puncta(cache=cache)
+    second = hit.fit_all_puncta(cache=cache)
+    assert cache.hits == len(hit) and first.sum() > 0
+    np.testing.assert_array_equal(first, second)
+    for cell, other in zip(hit, missed):
+        assert_same_state(cell, other)
+
+def test_old_cache_tables_are_ignored(tmp_path):
+    old = np.zeros(1, dtype=[("key", "S32"), ("x", "f8"), ("y", "f8"), ("sig", "f8"),
+                             ("converged", "?")])
+    with h5py.File(tmp_path / "cache.h5", "w") as HF:
+        HF["fitcache"] = old
+    assert len(FitCache(tmp_path / "cache.h5")) == 0
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> data, cell table round trip
+"""
+import h5py
+import numpy as np
+import pytest
+
+from puncta import FOV, Circle
+from puncta.data import Cell, CELL_DTYPE
+
+
+def cell_state(cell):
+    p = cell.punctum
+    return (cell._id, list(cell._coords), None if p is None else (p.x, p.y, p.r),
+            cell.converged)
+
+@pytest.fixture
+def fov():
+    """ cells in every punctum/convergence combination """
+    rng = np.random.default_rng(0)
+    fov = FOV(rng.uniform(0, 1, (64, 64)), id_="test")
+    for k, (punctum, converged) in enumerate([(Circle(3.25, 4.5, r=2.1), True),
+                                              (Circle(5, 6, r=3), False),
+                                              (Circle(1, 2, r=1.5), None),
+                                              (None, None),
+                                              (None, False)]):
+        fov.add_cell([4*k, 4*k + 12, 2*k, 2*k + 10])
+        fov[-1].punctum = punctum
+        fov[-1].converged = converged
+    return fov
+
+def test_table_round_trip(fov):
+    table = Cell.to_table(fov)
+    assert table.dtype == CELL_DTYPE
+    np.testing.assert_array_equal(table["status"], [1, 0, -1, -1, 0])
+    assert np.isnan(table["x"][3:]).all() and np.isnan(table["r"][3:]).all()
+    cells = Cell.from_table(fov, table)
+    assert [cell_state(c) for c in cells] == [cell_state(c) for c in fov]
+    assert all(c._parent is fov for c in cells)
+
+def test_empty_table(fov):
+    table = Cell.to_table([])
+    assert table.dtype == CELL_DTYPE and len(table) == 0
+    assert Cell.from_table(fov, table) == []
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_save_load_round_trip(fov, tmp_path, lazy):
+    fov.save(tmp_path / "fov.hdf5")
+    with FOV.load(tmp_path / "fov.hdf5", lazy=lazy) as loaded:
+        assert [cell_state(c) for c in loaded] == [cell_state(c) for c in fov]
+        np.testing.assert_array_equal(loaded[0].img, fov[0].img)
+
+def test_write_cells_rewrites_only_the_table(fov, tmp_path):
+    fov.save(tmp_path / "fov.hdf5")
+    fov[3].punctum, fov[3].converged = Circle(2, 2, r=1), True
+    fov[0].punctum, fov[0].converged = None, False
+    fov.add_cell([0, 8, 0, 8])
+    with h5py.File(tmp_path / "fov.hdf5", "r+") as HF:
+        fov.write_cells(HF)
+        assert HF["cells"].shape == (6,)
+        assert HF["raw"].shape == (64, 64)
+    loaded = FOV.load(tmp_path / "fov.hdf5")
+    assert [cell_state(c) for c in loaded] == [cell_state(c) for c in fov]
+    assert loaded[5].converged is None and loaded[5].punctum is None
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> detection, after background correction
+"""
+import numpy as np
+import pytest
+
+from puncta import FOV
+from puncta.background import ENGINES
+from puncta.detection import noise_level
+
+
+@pytest.mark.parametrize("method", sorted(ENGINES))
+def test_detect_after_correction(synthetic, method):
+    img, truth, nPuncta = synthetic
+    fov = FOV(img.astype(float) / 65535, id_="test")
+    fov.correct_background(method=method)
+    xy = fov.detect_puncta()
+    assert abs(len(xy) - nPuncta) <= 0.1*nPuncta
+    # detections sit on puncta, not on noise
+    onSignal = truth[xy[:, 1], xy[:, 0]] > 0.1*truth.max()
+    assert onSignal.mean() > 0.9
+
+def test_detect_prints_only_on_request(synthetic, capsys):
+    fov = FOV(synthetic[0].astype(float) / 65535, id_="test")
+    xy = fov.detect_puncta()
+    assert capsys.readouterr().out == ""
+    fov.detect_puncta(newCells=False, report=True)
+    assert capsys.readouterr().out.startswith(f"detected {len(xy)} puncta")
+
+def test_noise_level_zero_inflated():
+    rng = np.random.default_rng(0)
+    resp = rng.normal(0, 1, (256, 256))
+    resp[:, :200] = 0
+    mean, std = noise_level(resp, mask=resp != 0)
+    assert std == pytest.approx(1, rel=0.1)
+
+def test_noise_level_flat():
+    mean, std = noise_level(np.zeros((16, 16)))
+    assert std > 0
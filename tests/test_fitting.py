@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> fitting
+"""
+import numpy as np
+import pytest
+from scipy.optimize import curve_fit
+
+from puncta.fitting import fit_gaussians, fit_windows, moment_guess, stack_windows
+from puncta.round_things import gau2d, gau2d_circle
+
+
+def noisy_windows(model, n=12, seed=0):
+    """ Gaussians of random size and position in windows of varying shape """
+    rng = np.random.default_rng(seed)
+    imgs, truth = [], []
+    for k in range(n):
+        H, W = 13 + k % 3, 15 + k % 4
+        YY, XX = np.mgrid[:H, :W]
+        sx, sy = rng.uniform(1.2, 2.5, 2)
+        t = [rng.uniform(200, 500), rng.uniform(5, W - 6), rng.uniform(5, H - 6), sx, sy]
+        if model == "circle":
+            t = t[:4]
+            img = gau2d_circle((XX, YY), *t)
+        else:
+            img = gau2d((XX, YY), *t)
+        imgs.append(img + rng.normal(0, 5, img.shape))
+        truth.append(t)
+    return imgs, np.array(truth)
+
+@pytest.mark.parametrize("model", ["circle", "ellipse"])
+def test_parameter_recovery(model):
+    imgs, truth = noisy_windows(model)
+    p, converged = fit_windows(imgs, model=model)
+    assert p.shape == truth.shape
+    assert converged.all()
+    np.testing.assert_allclose(p[:, 1:3], truth[:, 1:3], atol=0.1)
+    np.testing.assert_allclose(p[:, 3:], truth[:, 3:], atol=0.1)
+    np.testing.assert_allclose(p[:, 0], truth[:, 0], rtol=0.05)
+
+@pytest.mark.parametrize("model", ["circle", "ellipse"])
+def test_matches_least_squares_optimum(model):
+    """ each window of the batch lands where curve_fit does on its own """
+    imgs, _ = noisy_windows(model, n=4, seed=1)
+    p, _ = fit_windows(imgs, model=model)
+    func = gau2d_circle if model == "circle" else gau2d
+    for img, pk in zip(imgs, p):
+        YY, XX = np.mgrid[:img.shape[0], :img.shape[1]]
+        beta, _ = curve_fit(func, np.vstack((XX.ravel(), YY.ravel())), img.ravel(), p0=pk)
+        beta[3:] = np.abs(beta[3:])
+        np.testing.assert_allclose(pk, beta, rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize("model", ["circle", "ellipse"])
+def test_flat_windows_do_not_converge(model):
+    rng = np.random.default_rng(2)
+    imgs, _ = noisy_windows(model, n=3)
+    flat = [np.full((15, 17), 100.0), np.zeros((15, 17)), 100 + rng.normal(0, 5, (15, 17))]
+    p, converged = fit_windows(imgs + flat, model=model)
+    assert converged[:3].all()
+    assert not converged[3:].any()
+
+def test_moment_guess_and_seeds():
+    imgs, truth = noisy_windows("circle", n=3)
+    stack, weights = stack_windows(imgs)
+    assert stack.shape == (3, 15, 17)
+    assert weights[0].sum() == imgs[0].size
+
+    p0 = moment_guess(stack, weights)
+    np.testing.assert_allclose(p0[:, 1:3], truth[:, 1:3], atol=0.5)
+    np.testing.assert_allclose(p0[:, 3], truth[:, 3], rtol=0.3)
+    assert moment_guess(stack, weights, model="ellipse").shape == (3, 5)
+
+    seeds = [(4, 6), (np.nan, np.nan), (7.5, 5.5)]
+    p0 = moment_guess(stack, weights, seeds=seeds)
+    np.testing.assert_array_equal(p0[[0, 2], 1:3], [(4, 6), (7.5, 5.5)])
+
+    p, converged = fit_gaussians(stack, weights, p0)
+    assert converged.all()
+    np.testing.assert_allclose(p[:, 1:3], truth[:, 1:3], atol=0.1)
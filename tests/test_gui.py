@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> gui, headless (skipped without PyQt5)
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+from skimage import io
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from puncta import gui
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+@pytest.fixture
+def controller(app):
+    ctrl = gui.PunctaController(workers=2)
+    yield ctrl
+    ctrl.shutdown()
+
+def wait_until(app, condition, timeout=60):
+    t0 = time.perf_counter()
+    while not condition():
+        app.processEvents()
+        assert time.perf_counter() - t0 < timeout, "timed out"
+        time.sleep(0.005)
+
+def load(app, controller, synthetic, tmp_path):
+    filename = tmp_path / "img.tif"
+    io.imsave(filename, synthetic[0], check_contrast=False)
+    loaded = []
+    controller.fovLoaded.connect(loaded.append)
+    controller.fileSelected.emit(filename)
+    wait_until(app, lambda: loaded)
+    return loaded[0]
+
+
+def test_load_in_background(app, controller, synthetic, tmp_path):
+    busy = []
+    controller.busyChanged.connect(busy.append)
+    fov = load(app, controller, synthetic, tmp_path)
+    assert controller.fov is fov
+    assert fov.img.shape == synthetic[0].shape
+    wait_until(app, lambda: busy == [True, False])
+
+def test_fit_all_applies_on_gui_thread(app, controller, synthetic, tmp_path):
+    fov = load(app, controller, synthetic, tmp_path)
+    fov.detect_puncta()
+    seeds = {cell: (cell.punctum.x, cell.punctum.y) for cell in fov}
+    updated = []
+    controller.cellUpdated.connect(updated.append)
+    controller.doFitAll.emit()
+    assert all(cell.punctum.x == seeds[cell][0] for cell in fov)
+    wait_until(app, lambda: not controller._workers)
+    assert set(updated) == set(fov)
+
+def test_cancel_drops_results(app, controller, synthetic, tmp_path):
+    fov = load(app, controller, synthetic, tmp_path)
+    fov.detect_puncta()
+    seeds = {cell: (cell.punctum.x, cell.punctum.y, cell.punctum.r) for cell in fov}
+    updated = []
+    controller.cellUpdated.connect(updated.append)
+    controller.doFitAll.emit()
+    controller.doCancel.emit()
+    wait_until(app, lambda: not controller._workers)
+    assert not updated
+    assert all((c.punctum.x, c.punctum.y, c.punctum.r) == seeds[c] for c in fov)
+
+def test_slider_moves_are_coalesced(app, controller, synthetic, tmp_path):
+    fov = load(app, controller, synthetic, tmp_path)
+    fov.detect_puncta()
+    canvas = gui.PunctaPickerCanvas(controller)
+    canvas.on_load_fov(fov)
+    canvas.draw()
+    shown = []
+    show = canvas.blitter.show
+    canvas.blitter.show = lambda cell: shown.append(cell) or show(cell)
+    for cell in fov[:20]:
+        controller.indexChanged.emit(cell)
+    assert shown == [fov[0]]
+    wait_until(app, lambda: not canvas._throttle.isActive())
+    assert shown == [fov[0], fov[19]]
+    assert np.array_equal(canvas.axCell._image.get_array(), fov[19].img)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> parallel
+"""
+import numpy as np
+import pytest
+
+from puncta import FOV, Circle
+from puncta.parallel import fit_crop, fit_cells
+
+
+@pytest.mark.parametrize("mode", ["zoom", "native"])
+def test_fit_crop_matches_cell_fit(synthetic, mode):
+    fov = FOV(synthetic[0].astype(float) / 65535, id_="test")
+    fov.correct_background(method="tophat")
+    fov.detect_puncta()
+    for cell in fov[:5]:
+        p = cell.punctum
+        fit, converged = fit_crop(np.array(cell.img), (p.x, p.y, p.r), mode=mode)
+        cell.fit_punctum(isTesting=False, mode=mode)
+        assert fit == pytest.approx((cell.punctum.x, cell.punctum.y, cell.punctum.r))
+        assert converged == cell.converged
+
+
+@pytest.mark.parametrize("mode", ["centroid", "zoom", "Native"])
+def test_batch_fits_reject_unknown_modes(synthetic, mode):
+    fov = FOV(synthetic[0][:128, :128].astype(float) / 65535, id_="test")
+    fov.detect_puncta()
+    before = [(c.punctum.x, c.punctum.y) for c in fov]
+    with pytest.raises(ValueError, match="unknown fit mode"):
+        fov.fit_all_puncta(mode=mode)
+    with pytest.raises(ValueError, match="unknown fit mode"):
+        fit_cells(list(fov), workers=1, mode=mode)
+    assert [(c.punctum.x, c.punctum.y) for c in fov] == before
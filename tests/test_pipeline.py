@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> pipeline, end to end through the batch app
+"""
+import json
+from pathlib import Path
+
+from skimage import io
+
+from benchmarks.bench_background import make_image
+from puncta import FOV
+from puncta.pipeline import process_file
+from app_puncta_batch import main
+
+
+def test_batch_cell_counts(tmp_path):
+    inDir, outDir = tmp_path / "in", tmp_path / "out"
+    inDir.mkdir()
+    nPuncta = 512**2 // 4000
+    for seed in range(3):
+        io.imsave(inDir / f"img{seed}.tif", make_image(512, seed=seed)[0],
+                  check_contrast=False)
+
+    args = [str(inDir), str(outDir), "--workers", "2", "--instrument", "--fit-cache"]
+    assert main(args) == 0
+    records = [json.loads(line) for line in open(outDir / "timings.jsonl")]
+    assert len(records) == 3
+    for record in records:
+        assert abs(record["cells"] - nPuncta) <= 0.1*nPuncta
+        assert record["converged"] <= record["cells"]
+        assert record["converged"] >= 0.8*nPuncta
+        fov = FOV.load(outDir / (Path(record["file"]).stem + ".hdf5"))
+        assert len(fov) == record["cells"]
+    assert (outDir / "stages.prom").exists()
+
+    # a rerun finds every output and processes nothing
+    assert main(args) == 0
+    assert len(open(outDir / "timings.jsonl").readlines()) == 3
+
+
+def test_process_file_is_silent(tmp_path, capsys):
+    io.imsave(tmp_path / "img.tif", make_image(256)[0], check_contrast=False)
+    record = process_file(tmp_path / "img.tif", tmp_path)
+    assert "error" not in record and record["cells"] > 0
+    assert capsys.readouterr().out == ""
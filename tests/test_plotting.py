@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> plotting, blitted cell switching on the Agg canvas
+"""
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.gridspec import GridSpec
+
+from puncta import FOV
+from puncta.plotting import CellBlitter
+
+
+@pytest.fixture
+def view(synthetic):
+    fov = FOV(synthetic[0].astype(float) / 65535, id_="test")
+    fov.correct_background(method="tophat")
+    fov.detect_puncta()
+    fov[3].punctum = None
+    # fixed layout: a tight layout moves the axes a little on every draw,
+    # so full draws would not be comparable (see test_moved_axes_draws_in_full)
+    fig = Figure(figsize=(6, 3))
+    canvas = FigureCanvasAgg(fig)
+    gs = GridSpec(1, 2)
+    axFOV = fig.add_subplot(gs[0], projection="fov")
+    axCell = fig.add_subplot(gs[1], projection="cell")
+    blitter = CellBlitter(canvas, axCell)
+    axFOV.plot(fov)
+    blitter.show(fov[0])
+    return fov, canvas, axCell, blitter
+
+def full_draw(canvas):
+    canvas.draw()
+    return np.array(canvas.buffer_rgba())
+
+def cell_pixels(canvas, ax):
+    """ the cell axes region of the canvas buffer, which blitting redraws """
+    x0, y0, x1, y1 = ax.bbox.extents
+    H = canvas.get_width_height()[1]
+    buffer = np.array(canvas.buffer_rgba())
+    return buffer[int(H - y1):int(np.ceil(H - y0)), int(x0):int(np.ceil(x1))]
+
+def check_artists(ax, cell):
+    assert np.array_equal(ax._image.get_array(), cell.img)
+    x, y = ax._outline.get_data()
+    if cell.punctum is None:
+        assert len(x) == 0
+    else:
+        assert np.mean(x[:-1]) == pytest.approx(cell.punctum.x, abs=0.05)
+        assert np.mean(y[:-1]) == pytest.approx(cell.punctum.y, abs=0.05)
+
+
+def test_switch_cells_blits(view):
+    fov, canvas, ax, blitter = view
+    full_draw(canvas)
+    before = cell_pixels(canvas, ax)
+    artists = (ax._image, ax._outline)
+    for cell in fov[1:8]:
+        assert cell.img.shape == fov[0].img.shape
+        assert blitter.show(cell)
+        check_artists(ax, cell)
+    assert (ax._image, ax._outline) == artists
+    assert list(ax.images) == [ax._image]
+    blitted = cell_pixels(canvas, ax)
+    assert not np.array_equal(blitted, before)
+    full_draw(canvas)
+    assert np.array_equal(blitted, cell_pixels(canvas, ax))
+
+def test_resize_invalidates_background(view):
+    fov, canvas, ax, blitter = view
+    full_draw(canvas)
+    canvas.figure.set_size_inches(8, 4)
+    assert not blitter.show(fov[1])
+    assert blitter.show(fov[2])
+    check_artists(ax, fov[2])
+    assert canvas.get_width_height() == (800, 400)
+    blitted = cell_pixels(canvas, ax)
+    full_draw(canvas)
+    assert np.array_equal(blitted, cell_pixels(canvas, ax))
+
+def test_new_crop_size_draws_in_full(view):
+    fov, canvas, ax, blitter = view
+    full_draw(canvas)
+    fov.add_cell([0, 40, 0, 30])
+    assert not blitter.show(fov[-1])
+    assert ax.get_xlim() == (-0.5, 39.5)
+    check_artists(ax, fov[-1])
+
+def test_moved_axes_draws_in_full(view):
+    fov, canvas, ax, blitter = view
+    full_draw(canvas)
+    ax.set_position([0.55, 0.1, 0.4, 0.8])
+    assert not blitter.show(fov[1])
+    assert blitter.show(fov[2])
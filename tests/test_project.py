@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> project
+"""
+import h5py
+import numpy as np
+import pytest
+
+from puncta import FOV, Circle
+from puncta.project import Project, INDEX_DTYPE, PUNCTA_DTYPE
+
+
+def make_fov(id_, nCells, shape=(48, 64)):
+    """ FOV with `nCells` cells; even cells have a punctum, every fourth converged """
+    fov = FOV(np.zeros(shape, dtype=np.uint16), id_=id_)
+    for k in range(nCells):
+        fov.add_cell([k, k + 10, k, k + 8])
+        if k % 2 == 0:
+            fov[-1].punctum = Circle(k + 1.5, 2.5, r=1 + k)
+            fov[-1].converged = k % 4 == 0
+    return fov
+
+def check_index(project, fovs):
+    """ the index matches the stored FOVs row by row """
+    index = project.index
+    assert index.dtype == INDEX_DTYPE and len(project) == len(fovs)
+    assert project.ids == [fov._id for fov in fovs] == list(project)
+    for row, fov in zip(index, fovs):
+        assert row["cells"] == len(fov)
+        assert row["puncta"] == sum(cell.punctum is not None for cell in fov)
+        assert (row["height"], row["width"]) == fov.img.shape
+    puncta = project.get_puncta()
+    assert len(puncta) == index["puncta"].sum()
+    assert set(np.char.decode(puncta["fov"])) <= set(project.ids)
+
+@pytest.fixture
+def project(tmp_path):
+    with Project(tmp_path / "project.h5") as project:
+        yield project
+
+def test_add_and_load(project):
+    fovs = [make_fov("a", 3), make_fov("b", 5, shape=(32, 40)), make_fov("c", 0)]
+    for fov in fovs:
+        project.add(fov)
+    check_index(project, fovs)
+    assert "b" in project and "z" not in project
+    loaded = project.load("b")
+    assert loaded.img.shape == (32, 40) and len(loaded) == 5
+    assert [c.converged for c in loaded] == [c.converged for c in fovs[1]]
+    with project.load("a", lazy=True) as lazy:
+        np.testing.assert_array_equal(lazy[1].img, fovs[0][1].img)
+
+    with pytest.raises(ValueError, match="already"):
+        project.add(make_fov("a", 1))
+    fovs[0] = make_fov("a", 6)
+    project.add(fovs[0], replace=True)
+    check_index(project, fovs)
+
+def test_update_cells(project):
+    fovs = [make_fov("a", 3), make_fov("b", 4)]
+    for fov in fovs:
+        project.add(fov)
+    assert len(project.get_puncta(fovs=["b"])) == 2   # caches the table
+
+    fovs[1].add_cell([0, 5, 0, 5])
+    fovs[1][-1].punctum, fovs[1][-1].converged = Circle(1, 1, r=1), True
+    fovs[1][0].punctum = None
+    project.update_cells(fovs[1])
+    check_index(project, fovs)
+    assert len(project.get_puncta(fovs=["b"])) == 2
+    assert len(project.load("b")) == 5
+    with pytest.raises(KeyError):
+        project.update_cells(make_fov("z", 1))
+
+def test_remove_keeps_index_consistent(project):
+    fovs = [make_fov(id_, n) for id_, n in zip("abcde", (3, 5, 1, 4, 2))]
+    for fov in fovs:
+        project.add(fov)
+    project.get_puncta()
+    for id_ in ("c", "a", "e"):
+        project.remove(id_)
+        fovs = [fov for fov in fovs if fov._id != id_]
+        check_index(project, fovs)
+        assert id_ not in project
+        assert id_.encode() not in project.get_puncta()["fov"]
+    # a removed id can be stored again, at the end of the index
+    project.add(make_fov("a", 2))
+    check_index(project, fovs + [make_fov("a", 2)])
+
+def test_get_puncta_filters(project):
+    for fov in (make_fov("a", 5), make_fov("b", 3)):
+        project.add(fov)
+    puncta = project.get_puncta()
+    assert puncta.dtype == PUNCTA_DTYPE and len(puncta) == 3 + 2
+    assert list(np.char.decode(puncta["fov"])) == ["a"]*3 + ["b"]*2
+    np.testing.assert_array_equal(puncta["r"], [1, 3, 5, 1, 3])
+    assert len(project.get_puncta(fovs=["b"])) == 2
+    assert len(project.get_puncta(fovs=[])) == 0
+    assert list(project.get_puncta(converged=True)["r"]) == [1, 5, 1]
+    assert list(project.get_puncta(converged=False)["r"]) == [3, 3]
+
+def test_long_ids_are_refused(project):
+    project.add(make_fov("a", 1))
+    with pytest.raises(ValueError, match="longer than 64 bytes"):
+        project.add(make_fov("x"*65, 1))
+    fov = make_fov("b", 2)
+    fov[1]._id = "b:" + "y"*63
+    with pytest.raises(ValueError, match="longer than 64 bytes"):
+        project.add(fov)
+    # nothing was written
+    assert project.ids == ["a"] and "b" not in project
+    # ids of exactly 64 bytes fit; cell ids extend the FOV id
+    project.add(make_fov("x"*64, 0))
+    project.add(make_fov("y"*60, 2))
+    assert project.ids == ["a", "x"*64, "y"*60]
+    assert project.load("y"*60)[1]._id == "y"*60 + ":001"
+
+def test_read_only(tmp_path):
+    with h5py.File(tmp_path / "empty.h5", "w"):
+        pass
+    with Project(tmp_path / "empty.h5", mode="r") as project:
+        assert len(project) == 0 and project.ids == [] and "a" not in project
+        assert len(project.get_puncta()) == 0
+    with h5py.File(tmp_path / "empty.h5", "r") as HF:
+        assert list(HF) == []
+
+    with Project(tmp_path / "project.h5") as project:
+        project.add(make_fov("a", 3))
+    with Project(tmp_path / "project.h5", mode="r") as project:
+        assert project.ids == ["a"] and len(project.load("a")) == 3
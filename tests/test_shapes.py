@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+shapes package
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import shapes
+import shapes.graphics
+from conftest import ROOT
+
+
+def run(code):
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONPATH=str(ROOT))
+    return subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                          capture_output=True, text=True)
+
+@pytest.mark.parametrize("imports", ["import shapes.graphics; import matplotlib.pyplot as plt",
+                                     "import matplotlib.pyplot as plt; import shapes.graphics",
+                                     "import shapes, matplotlib.pyplot as plt; shapes.graphics"])
+def test_shape_projection_after_graphics_import(imports):
+    proc = run(imports + "\n"
+               "import shapes\n"
+               "ax = plt.figure().add_subplot(projection='shape')\n"
+               "ax.plot_shape(shapes.Circle(0, 0, 1))\n"
+               "assert type(ax).__name__ == 'ShapeAxes'")
+    assert proc.returncode == 0, proc.stderr
+
+@pytest.mark.parametrize("imports", ["import shapes; import matplotlib.pyplot as plt",
+                                     "import matplotlib.pyplot as plt; import shapes"])
+def test_shape_projection_needs_graphics(imports):
+    proc = run(imports + "\n"
+               "import sys\n"
+               "assert 'shapes.graphics' not in sys.modules\n"
+               "plt.figure().add_subplot(projection='shape')")
+    assert proc.returncode != 0 and "shape" in proc.stderr
+
+def test_shapes_import_stays_lazy():
+    proc = run("import sys, shapes\n"
+               "assert 'matplotlib' not in sys.modules\n"
+               "assert 'shapes.graphics' not in sys.modules")
+    assert proc.returncode == 0, proc.stderr
+
+
+@pytest.fixture
+def axes():
+    return lambda: Figure().add_subplot(aspect="equal", projection="shape")
+
+def test_limits_independent_of_call_order(axes):
+    small, far = shapes.Circle(0, 0, 1), [shapes.Circle(30, -25, 2), shapes.Circle(5, 5, 1)]
+    ax1, ax2 = axes(), axes()
+    ax1.plot_shape(small)
+    ax1.plot_shapes(far)
+    ax2.plot_shapes(far)
+    ax2.plot_shape(small)
+    assert ax1.get_xlim() == ax2.get_xlim() == (-10, 32)
+    assert ax1.get_ylim() == ax2.get_ylim() == (-27, 10)
+
+def test_small_shapes_keep_default_limits(axes):
+    ax1, ax2 = axes(), axes()
+    ax1.plot_shape(shapes.Circle(0, 0, 1))
+    ax2.plot_shapes([shapes.Circle(0, 0, 1), shapes.Circle(2, 2, 1)])
+    assert ax1.get_xlim() == ax2.get_xlim() == (-10, 10)
+    assert ax1.get_ylim() == ax2.get_ylim() == (-10, 10)
+
+
+# ==============================================================================
+# spatial index
+# ==============================================================================
+def random_shapes(rng, n=300, size=100.0):
+    """ circles and squares; every tenth is a zero-area circle """
+    items = []
+    for k in range(n):
+        x, y = rng.uniform(0, size, 2)
+        if k % 10 == 0:
+            items.append(shapes.Circle(x, y, 0))
+        elif k % 2:
+            items.append(shapes.Circle(x, y, rng.uniform(0.5, 5)))
+        else:
+            items.append(shapes.Square(x, y, rng.uniform(0.5, 8)))
+    return items
+
+def brute_box(items, xMin, xMax, yMin, yMax):
+    bounds = np.array([s.get_bounds() for s in items]).T
+    x1, x2, y1, y2 = bounds
+    return np.flatnonzero((x1 <= xMax) & (x2 >= xMin) & (y1 <= yMax) & (y2 >= yMin))
+
+def check_grid(grid, items, rng):
+    """ every ShapeGrid query against a loop over all shapes """
+    points = np.vstack((rng.uniform(-20, 120, (50, 2)),
+                        [(s.x, s.y) for s in items[::10]]))   # zero-area shapes
+    for x, y in points:
+        expected = [i for i, s in enumerate(items) if s.contains(x, y)]
+        assert sorted(grid.query_point(x, y)) == expected
+
+        box = x, x + rng.uniform(0, 30), y, y + rng.uniform(0, 30)
+        assert sorted(grid.query_box(*box)) == list(brute_box(items, *box))
+
+        d = np.hypot([s.x - x for s in items], [s.y - y for s in items])
+        for k in (1, 7):
+            idx, dist = grid.query_nearest(x, y, k)
+            np.testing.assert_allclose(dist, np.sort(d)[:k])
+            np.testing.assert_allclose(d[idx], dist)
+
+def test_grid_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    items = random_shapes(rng)
+    check_grid(shapes.ShapeGrid(items), items, rng)
+    check_grid(shapes.ShapeGrid(items, cellSize=3), items, rng)
+
+def test_grid_tracks_moved_shapes():
+    rng = np.random.default_rng(1)
+    items = random_shapes(rng)
+    grid = shapes.ShapeGrid(items)
+
+    # a few moves are tracked without a rebuild, including off the grid
+    grid.translate(3, dx=40, dy=-15)
+    items[5].x, items[5].y = 500, -300
+    items[10].x += 2   # zero-area
+    grid.update([5, 10])
+    assert len(grid._movedIdx) == 3
+    check_grid(grid, items, rng)
+
+    # enough moves trigger a rebuild
+    for j in range(0, 200, 2):
+        items[j].translate(*rng.uniform(-10, 10, 2))
+    grid.update(np.arange(0, 200, 2))
+    assert not grid._movedIdx
+    check_grid(grid, items, rng)
+
+def test_grid_refresh_after_array_translate():
+    rng = np.random.default_rng(2)
+    arr = shapes.CircleArray(*rng.uniform(0, 100, (2, 200)), r=rng.uniform(0, 4, 200))
+    arr.r[::10] = 0
+    grid = shapes.ShapeGrid(arr)
+    arr.translate(rng.uniform(-30, 30, 200), rng.uniform(-30, 30, 200))
+    grid.refresh()
+    check_grid(grid, arr.to_shapes(), rng)
+
+def test_grid_of_coincident_points():
+    items = [shapes.Circle(5, 5, 0) for _ in range(4)]
+    grid = shapes.ShapeGrid(items)
+    assert sorted(grid.query_point(5, 5)) == [0, 1, 2, 3]
+    assert grid.query_point(5, 5.5).size == 0
+    assert sorted(grid.query_nearest(0, 0, k=10)[0]) == [0, 1, 2, 3]
+
+
+# ==============================================================================
+# overlaps
+# ==============================================================================
+def circle_pairs(a, b, same):
+    """ overlapping (i, j) pairs by a loop over all pairs """
+    pairs = []
+    for i in range(len(a)):
+        for j in range(i + 1 if same else 0, len(b)):
+            d = np.hypot(a.x[i] - b.x[j], a.y[i] - b.y[j])
+            if d < a.r[i] + b.r[j] and min(a.r[i], b.r[j]) > 0:
+                pairs.append((i, j))
+    return pairs
+
+def rect_area(a, i, b, j):
+    w = min(a.x[i] + a.w[i]/2, b.x[j] + b.w[j]/2) - max(a.x[i] - a.w[i]/2, b.x[j] - b.w[j]/2)
+    h = min(a.y[i] + a.h[i]/2, b.y[j] + b.h[j]/2) - max(a.y[i] - a.h[i]/2, b.y[j] - b.h[j]/2)
+    return max(w, 0) * max(h, 0)
+
+def random_circles(rng, n, size=100.0):
+    arr = shapes.CircleArray(*rng.uniform(0, size, (2, n)), r=rng.uniform(0.5, 6, n))
+    arr.r[::10] = 0
+    return arr
+
+@pytest.mark.parametrize("blockSize", [2**20, 50])
+def test_overlap_methods_agree(blockSize):
+    rng = np.random.default_rng(3)
+    a, b = random_circles(rng, 300), random_circles(rng, 120)
+    for args, same in (((a,), True), ((a, b), False)):
+        results = [shapes.find_overlaps(*args, method=m, blockSize=blockSize)
+                   for m in ("grid", "sweep", "brute")]
+        for I, J, A in results:
+            assert list(zip(I, J)) == circle_pairs(a, args[-1], same)
+            assert np.all(A > 0)
+        for I, J, A in results[:2]:
+            np.testing.assert_allclose(A, results[2][2])
+
+def test_overlaps_after_moving_shapes():
+    rng = np.random.default_rng(4)
+    a = random_circles(rng, 200)
+    before = shapes.find_overlaps(a)
+    a.translate(rng.uniform(-20, 20, 200), rng.uniform(-20, 20, 200))
+    for m in ("grid", "sweep"):
+        I, J, _ = shapes.find_overlaps(a, method=m)
+        assert list(zip(I, J)) == circle_pairs(a, a, True)
+    assert not np.array_equal(before[0], shapes.find_overlaps(a)[0])
+
+def test_rectangle_overlap_areas():
+    rng = np.random.default_rng(5)
+    w, h = rng.uniform(0, 10, (2, 150))
+    w[::10] = 0
+    a = shapes.RectangleArray(*rng.uniform(0, 60, (2, 150)), w=w, h=h)
+    expected = [(i, j, rect_area(a, i, a, j)) for i in range(150) for j in range(i + 1, 150)]
+    expected = [e for e in expected if e[2] > 0]
+    for m in ("grid", "sweep", "brute"):
+        I, J, A = shapes.find_overlaps(a, method=m)
+        assert list(zip(I, J)) == [e[:2] for e in expected]
+        np.testing.assert_allclose(A, [e[2] for e in expected])
+
+def test_circle_rectangle_areas():
+    circles = shapes.CircleArray(x=[0, 0, 10, 3], y=[0, 0, 0, 0], r=[1, 2, 1, 0])
+    rects = shapes.RectangleArray(x=[0, 1], y=[0, 0], w=[10, 2], h=[10, 2])
+    I, J, A = shapes.find_overlaps(circles, rects)
+    # circles 0 and 1 lie inside rectangle 0 and cut rectangle 1; circle 2
+    # is beyond x = 5 and circle 3 has no area
+    assert list(zip(I, J)) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    np.testing.assert_allclose(A[[0, 2]], [np.pi, 4*np.pi])
+    # grid-sampled area of circle k inside rectangle 1
+    u = np.linspace(-3, 3, 3001)
+    X, Y = np.meshgrid(u, u)
+    for idx, k in ((1, 0), (3, 1)):
+        inside = (X**2 + Y**2 <= circles.r[k]**2) & (np.abs(X - 1) <= 1) & (np.abs(Y) <= 1)
+        assert A[idx] == pytest.approx(inside.sum() * (u[1] - u[0])**2, rel=1e-2)
+    assert np.all(shapes.overlaps.circle_box_area(np.zeros(2), -1, 1, -1, 1) == 0)
+
+
+# ==============================================================================
+# rasterization
+# ==============================================================================
+def brute_labels(items, imageShape):
+    """ label image by testing every pixel center against every shape """
+    labels = np.zeros(imageShape, dtype=int)
+    for k, s in enumerate(items):
+        for i in range(imageShape[0]):
+            for j in range(imageShape[1]):
+                if s.contains(j, i):
+                    labels[i, j] = k + 1
+    return labels
+
+@pytest.fixture
+def raster_shapes():
+    rng = np.random.default_rng(6)
+    circles = shapes.CircleArray(*rng.uniform(-5, 45, (2, 40)), r=rng.uniform(0.3, 6, 40))
+    circles.r[::8] = 0
+    circles.x[0], circles.y[0] = 7, 9   # zero-area on a pixel center
+    w, h = rng.uniform(0, 9, (2, 30))
+    w[::6] = 0
+    rects = shapes.RectangleArray(*rng.uniform(-5, 45, (2, 30)), w=w, h=h)
+    return circles, rects
+
+@pytest.mark.parametrize("blockSize", [2**22, 17])
+def test_rasterize_matches_brute_force(raster_shapes, blockSize):
+    imageShape = (33, 41)
+    for arr in raster_shapes:
+        items = arr.to_shapes()
+        expected = brute_labels(items, imageShape)
+        labels = shapes.rasterize(arr, imageShape, mode="labels", blockSize=blockSize)
+        np.testing.assert_array_equal(labels, expected)
+        mask = shapes.rasterize(arr, imageShape, blockSize=blockSize)
+        np.testing.assert_array_equal(mask, expected > 0)
+        sparse = shapes.rasterize(arr, imageShape, mode="sparse", blockSize=blockSize)
+        assert len(sparse) == len(arr)
+        for k, (rows, cols) in enumerate(sparse):
+            single = brute_labels(items[k:k+1], imageShape)
+            assert sorted(zip(rows, cols)) == list(zip(*np.nonzero(single)))
+    assert labels.dtype == np.int32 and mask.dtype == bool
+    assert sparse[0][0].size == 0   # zero-width rectangle at index 0
+    rows, cols = shapes.rasterize(raster_shapes[0], imageShape, mode="sparse")[0]
+    assert list(zip(rows, cols)) == [(9, 7)]   # zero-area circle on a pixel center
+
+def test_rasterize_moved_shapes(raster_shapes):
+    circles, _ = raster_shapes
+    before = shapes.rasterize(circles, (33, 41), mode="labels")
+    circles.translate(3.5, -2)
+    after = shapes.rasterize(circles, (33, 41), mode="labels")
+    np.testing.assert_array_equal(after, brute_labels(circles.to_shapes(), (33, 41)))
+    assert not np.array_equal(before, after)
+
+def test_rasterize_antialias_coverage(raster_shapes):
+    for arr in raster_shapes:
+        # coverage sums to the area for shapes well inside the image
+        inside = ((arr.get_bounds()[0] > 0) & (arr.get_bounds()[1] < 40)
+                  & (arr.get_bounds()[2] > 0) & (arr.get_bounds()[3] < 32))
+        sparse = shapes.rasterize(arr, (33, 41), mode="sparse", antialias=True)
+        for k in np.flatnonzero(inside):
+            rows, cols, cov = sparse[k]
+            assert np.all((cov > 0) & (cov <= 1 + 1e-12))
+            assert cov.sum() == pytest.approx(arr.get_area()[k], abs=1e-9)
+        mask = shapes.rasterize(arr, (33, 41), antialias=True)
+        assert mask.dtype == float and mask.min() >= 0 and mask.max() <= 1 + 1e-12
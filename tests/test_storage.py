@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> storage
+"""
+import h5py
+import numpy as np
+import pytest
+
+from puncta.storage import ChunkCache, LazyImage
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = ChunkCache(maxBytes=3*800)
+    chunk = lambda v: (lambda: np.full(100, v, dtype=float))   # 800 bytes
+    for key in "abc":
+        cache.get(key, chunk(key == "a"))
+    assert len(cache) == 3 and cache.nbytes == 2400 and cache.misses == 3
+
+    cache.get("a", chunk(0))   # hit: "a" becomes most recent
+    assert cache.hits == 1
+    cache.get("d", chunk(0))   # evicts "b", the least recently used
+    assert list(cache._chunks) == ["c", "a", "d"] and cache.nbytes == 2400
+    assert cache.get("a", chunk(0))[0] == 1
+
+    # eviction is by bytes: a large chunk pushes out several small ones
+    cache.get("big", lambda: np.zeros(150))
+    assert list(cache._chunks) == ["a", "big"] and cache.nbytes == 800 + 1200
+    # a single chunk over the limit is still kept
+    cache.get("huge", lambda: np.zeros(1000))
+    assert list(cache._chunks) == ["huge"] and cache.nbytes == 8000
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+@pytest.fixture
+def data(tmp_path):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 2**16, (37, 29), dtype=np.uint16)
+    stack = np.dstack((img, img[::-1] + 1))
+    with h5py.File(tmp_path / "img.h5", "w") as HF:
+        HF.create_dataset("chunked", data=img, chunks=(8, 6), compression="gzip")
+        HF.create_dataset("plain", data=img)
+        HF.create_dataset("stacked", data=stack, chunks=(8, 8, 2))
+    with h5py.File(tmp_path / "img.h5", "r") as HF:
+        yield HF, stack
+
+INDEXES = [np.s_[5:19, 3:27],      # straddles several chunks both ways
+           np.s_[7:9, 5:7],        # single pixels of four chunks
+           np.s_[-10:, :-4],       # negative bounds
+           np.s_[-30:-2, -20:-1],
+           np.s_[3],               # integer rows and columns
+           np.s_[-1, 2:20],
+           np.s_[4:20, -3],
+           np.s_[12, 17],
+           np.s_[::3, 1:20:4],     # steps fall back to a full read
+           np.s_[::-1, 5:9],
+           np.s_[20:10, :],        # empty
+           np.s_[:, 100:],
+           np.s_[:, :],
+           np.s_[...]]             # so does anything but ints and slices
+
+@pytest.mark.parametrize("name, channel", [("chunked", None), ("plain", None),
+                                           ("stacked", 0), ("stacked", 1)])
+def test_lazy_image_matches_eager(data, name, channel):
+    HF, stack = data
+    expected = stack[:, :, channel or 0]
+    lazy = LazyImage(HF[name], channel=channel, cache=ChunkCache(), tileSize=10)
+    assert lazy.shape == expected.shape and len(lazy) == 37
+    np.testing.assert_array_equal(np.asarray(lazy), expected)
+    assert np.asarray(lazy, dtype=float).dtype == float
+    for index in INDEXES:
+        np.testing.assert_array_equal(lazy[index], expected[index], err_msg=str(index))
+    with pytest.raises(IndexError):
+        lazy[37, 0]
+
+def test_lazy_reads_only_touched_chunks(data):
+    HF, stack = data
+    cache = ChunkCache()
+    lazy = LazyImage(HF["chunked"], cache=cache)
+    lazy[5:19, 3:9]   # rows in chunks 0-2, columns in chunks 0-1
+    assert cache.misses == 6 and len(cache) == 6
+    lazy[9:17, 4:8]   # four of the chunks already read
+    assert cache.misses == 6 and cache.hits == 4
+    np.asarray(lazy)  # whole image bypasses the cache
+    assert cache.misses == 6 and len(cache) == 6
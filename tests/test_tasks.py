@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> tasks, the picker's background work without Qt
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from skimage import io
+
+from puncta import FOV, Circle
+from puncta.parallel import fit_crop
+from puncta.tasks import Task, load_fov_task, fit_jobs, fit_cells_task, apply_fit
+
+
+@pytest.fixture(scope="module")
+def fov(synthetic):
+    fov = FOV(synthetic[0], id_="test")
+    fov.correct_background(method="tophat")
+    fov.detect_puncta()
+    return fov
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(2) as pool:
+        yield pool
+
+def seeds_of(fov):
+    return [(c.punctum.x, c.punctum.y, c.punctum.r) for c in fov]
+
+
+def test_task_outcomes():
+    assert Task(lambda task, a, b=0: a + b, 1, b=2).run() == ("result", 3)
+    assert Task(lambda task: 1 / 0).run() == ("error", "ZeroDivisionError: division by zero")
+
+    def cancel_midway(task):
+        task.report(0, 2)
+        task.check_cancelled()
+        return "done"
+    progress = []
+    task = Task(cancel_midway, onProgress=lambda i, n: progress.append(i) or task.cancel())
+    assert task.run() == ("cancelled", None) and progress == [0]
+
+    task = Task(lambda task: "never")
+    task.cancel()
+    assert task.run() == ("cancelled", None)
+
+def test_deliver_drops_after_cancel():
+    got = []
+    task = Task(lambda task: None)
+    task.deliver(got.append, 1)
+    task.cancel()
+    task.deliver(got.append, 2)
+    assert got == [1]
+
+def test_fit_cells_task_sends_every_fit(fov, executor):
+    cells = list(fov[:6])
+    before = seeds_of(cells)
+    jobs = fit_jobs(cells)
+    sent, progress = [], []
+    task = Task(fit_cells_task, jobs, executor, "native",
+                onPartial=sent.append, onProgress=lambda i, n: progress.append((i, n)))
+    assert task.run() == ("result", 6)
+    assert sorted(i for i, _ in sent) == list(range(6))
+    assert progress[-1] == (6, 6) and len(progress) == 6
+    for i, fit in sent:
+        assert fit == fit_crop(*jobs[i], "native")
+    # fits are only sent, cells are left alone
+    assert seeds_of(cells) == before
+
+def test_fit_jobs_are_snapshots(fov):
+    cell = fov[0]
+    crop, seed = fit_jobs([cell])[0]
+    assert seed == (cell.punctum.x, cell.punctum.y, cell.punctum.r)
+    np.testing.assert_array_equal(crop, cell.img)
+    assert not np.shares_memory(crop, fov.img)
+
+def test_failed_fits_are_sent_as_exceptions(fov, executor):
+    jobs = fit_jobs(fov[:2]) + [(np.zeros((4, 4)), None)]
+    sent = []
+    assert Task(fit_cells_task, jobs, executor, "native", onPartial=sent.append).run()[0] == "result"
+    fits = dict(sent)
+    assert isinstance(fits[2], Exception)
+    assert not isinstance(fits[0], Exception) and not isinstance(fits[1], Exception)
+
+def test_cancel_stops_fitting(fov, executor):
+    sent = []
+    task = Task(fit_cells_task, fit_jobs(fov[:10]), executor, "native",
+                onPartial=lambda value: sent.append(value) or task.cancel())
+    assert task.run() == ("cancelled", None)
+    assert len(sent) == 1
+
+def test_apply_fit_rules(fov, synthetic):
+    cell = fov[0]
+    state = (cell.punctum.x, cell.punctum.y, cell.punctum.r), cell.converged
+    other = FOV(synthetic[0], id_="other")
+
+    # fits of cells of another FOV, or with no FOV loaded, are dropped
+    assert not apply_fit(other, cell, ((1.0, 2.0, 3.0), True))
+    assert not apply_fit(None, cell, ((1.0, 2.0, 3.0), True))
+    assert ((cell.punctum.x, cell.punctum.y, cell.punctum.r), cell.converged) == state
+    with pytest.raises(ValueError, match="bad"):
+        apply_fit(fov, cell, ValueError("bad"))
+
+    assert apply_fit(fov, cell, ((1.0, 2.0, 3.0), False))
+    assert (cell.punctum.x, cell.punctum.y, cell.punctum.r) == (1.0, 2.0, 3.0)
+    assert cell.converged is False
+    # zoom fits report no convergence and leave the flag as it was
+    assert apply_fit(fov, cell, ((4.0, 5.0, 6.0), None))
+    assert cell.punctum.x == 4.0 and cell.converged is False
+    cell.punctum, cell.converged = Circle(*state[0][:2], r=state[0][2]), state[1]
+
+def test_load_fov_task(synthetic, tmp_path):
+    io.imsave(tmp_path / "img.tif", synthetic[0], check_contrast=False)
+    progress = []
+    status, fov = Task(load_fov_task, tmp_path / "img.tif",
+                       onProgress=lambda i, n: progress.append((i, n))).run()
+    assert status == "result" and fov.img.shape == synthetic[0].shape
+    assert progress == [(0, 2), (1, 2), (2, 2)]
+
+    # cancelled while reading: the background is never corrected
+    task = Task(load_fov_task, tmp_path / "img.tif", onProgress=lambda i, n: task.cancel())
+    assert task.run() == ("cancelled", None)
+    assert task.cancelled
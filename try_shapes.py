@@ -6,6 +6,7 @@ script: try shapes package
 
 import matplotlib.pyplot as plt
 import shapes
+import shapes.graphics   # registers the "shape" projection
 
 # ==============================================================================
 c1 = shapes.Circle(0,0,1)
@@ -29,3 +30,18 @@ ax = plt.subplot(1, 1, 1, aspect="equal", projection="shape")
 for sh in shapesList:
     ax.plot_shape(sh)
 plt.show()
+
+# ==============================================================================
+circles = shapes.CircleArray.from_shapes(sh for sh in shapesList
+                                         if isinstance(sh, shapes.Circle))
+rects = shapes.RectangleArray.from_shapes(sh for sh in shapesList
+                                          if isinstance(sh, shapes.Square))
+circles.translate(1, -1)
+print(circles, circles.get_area())
+print(rects, rects.get_perimeter())
+print(rects.filter(rects.get_area() > 5).to_shapes())
+
+ax = plt.subplot(1, 1, 1, aspect="equal", projection="shape")
+ax.plot_shapes(shapesList)
+ax.plot_shapes(circles, colors="k", ls="--")
+plt.show()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta batch pipeline, headless
+
+Background-corrects, detects and fits the puncta of every TIFF in a
+directory, writing one FOV file per image into the output directory.
+Images are processed in parallel, one worker process per image.
+Files with an output already present are skipped, so an interrupted run
+continues where it stopped. Per-file timings are appended to
+<output>/timings.jsonl; with --instrument, every instrumented stage is
+appended to <output>/stages.jsonl and totals per stage are written to
+<output>/stages.prom for a Prometheus textfile collector.
+
+    python app_puncta_batch.py images/ results/ [--workers 8] [--queue 16]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # shapes
+from puncta import pipeline
+from puncta.background import ENGINES
+from puncta.instrument import write_jsonl, write_prometheus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("input", type=Path, help="directory of images")
+    parser.add_argument("output", type=Path, help="directory for the FOV files")
+    parser.add_argument("--pattern", default="*.tif*", help="image file pattern")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes (default: all cores)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="files in flight (default: twice the workers)")
+    parser.add_argument("--method", default="reconstruction", choices=sorted(ENGINES),
+                        help="background engine")
+    parser.add_argument("--sigma", type=float, default=1.5, help="punctum size for detection")
+    parser.add_argument("--model", default="circle", choices=["circle", "ellipse"])
+    parser.add_argument("--compression", default="gzip")
+    parser.add_argument("--dtype", default="float64", choices=["float64", "float32"],
+                        help="precision of the corrected image")
+    parser.add_argument("--fit-cache", dest="fitCache", action="store_true",
+                        help="keep fits in sidecar files and reuse them on reruns")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record time, I/O and memory of every stage")
+    parser.add_argument("--trace-memory", dest="traceMemory", action="store_true",
+                        help="trace peak memory per stage (slower)")
+    parser.add_argument("--profile", action="store_true",
+                        help="dump a cProfile of every file to <output>/<name>.pstats")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="reprocess files that already have an output")
+    args = parser.parse_args(argv)
+
+    filenames = sorted(args.input.glob(args.pattern))
+    print(f"{len(filenames)} images in {args.input}")
+    records, stages = [], []
+    for record in pipeline.run(filenames, args.output, workers=args.workers,
+                               maxInFlight=args.queue, resume=args.resume,
+                               method=args.method, sigma=args.sigma, model=args.model,
+                               compression=args.compression, dtype=args.dtype,
+                               fitCache=args.fitCache, instrument=args.instrument,
+                               profile=args.profile, traceMemory=args.traceMemory):
+        records.append(record)
+        stages += record.get("stages", [])
+        if record.get("stages"):
+            write_jsonl(record["stages"], args.output / "stages.jsonl")
+        pipeline.log_record(record, args.output / "timings.jsonl")
+        if "error" in record:
+            print(f"FAILED {record['file']}: {record['error']}", flush=True)
+        else:
+            print(f"{Path(record['file']).name}: {record['cells']} cells, "
+                  f"{record['converged']} fits, {record['total']:.2f} s", flush=True)
+    print(pipeline.summarize(records))
+    if stages:
+        write_prometheus(stages, args.output / "stages.prom")
+    return 1 if any("error" in r for r in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,13 +6,16 @@ puncta picker app
 from PyQt5.QtWidgets import QApplication
 from PyQt5 import QtWidgets, QtCore, QtGui
 import sys
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # shapes
 from puncta import gui
 
 class PunctaPickerApp(QtWidgets.QMainWindow):
 
     def __init__(self):
         self.controller = gui.PunctaController()
+        self.controller.failed.connect(self.show_error)
         super().__init__(windowTitle="Puncta Picker")
         self.resize(1000, 600)
         self.layout()
@@ -29,12 +32,22 @@ class PunctaPickerApp(QtWidgets.QMainWindow):
         hbox2.addWidget(gui.CellSlider(self.controller), stretch=1)
         hbox2.addWidget(gui.CellIdLabel(self.controller))
         hbox2.addWidget(gui.FitButton(self.controller))
+        hbox2.addWidget(gui.FitAllButton(self.controller))
+        hbox2.addWidget(gui.TaskProgressBar(self.controller))
+        hbox2.addWidget(gui.CancelButton(self.controller))
 
         vbox.addLayout(hbox1, stretch=1)
         vbox.addLayout(hbox2)
         pnl.setLayout(vbox)
         self.setCentralWidget(pnl)
 
+    def show_error(self, msg):
+        QtWidgets.QMessageBox.warning(self, "Puncta Picker", msg)
+
+    def closeEvent(self, evt):
+        self.controller.shutdown()
+        super().closeEvent(evt)
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv) if not QApplication.instance() else QApplication.instance()
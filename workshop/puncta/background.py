@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> background
+"""
+
+import tempfile
+import numpy as np
+from pathlib import Path
+from scipy import ndimage
+from skimage.morphology import reconstruction
+
+from .parallel import get_executor
+
+
+# ==============================================================================
+# engines
+# ==============================================================================
+ENGINES = {}
+
+def register_engine(name, counts=False):
+    """ decorator adding a background engine to ENGINES
+
+    An engine takes the smoothed float image and keyword options and
+    returns its background, to be subtracted (see `subtract_background`).
+    With `counts`, the engine is also given `counts`, the intensity counts
+    in one unit of the float image (see `intensity_counts`).
+    """
+    def register(func):
+        func.usesCounts = counts
+        ENGINES[name] = func
+        return func
+    return register
+
+def intensity_counts(img):
+    """ counts in one unit of the float image `smooth_float` makes of `img`
+
+    The dtype's maximum for integer images, which are scaled to [0, 1];
+    None for float images, whose scale only the caller knows.
+    """
+    dtype = np.asarray(img).dtype
+    if dtype.kind in "ui":
+        return np.iinfo(dtype).max
+    return None
+
+def smooth_float(img, sigma=1, dtype=float, out=None):
+    """ `img` smoothed by a Gaussian of `sigma`, scaled as by `img_as_float`
+
+    Integer images are filtered straight into `out` (or a new array of
+    `dtype`) and scaled there, without a full-size float copy of `img`.
+    """
+    img = np.asarray(img)
+    if img.dtype == bool:
+        img = img.astype(dtype)
+    if out is None:
+        out = np.empty(img.shape, dtype=dtype)
+    ndimage.gaussian_filter(img, sigma, output=out)
+    if img.dtype.kind in "ui":
+        out *= 1 / np.iinfo(img.dtype).max
+    return out
+
+def subtract_background(img, method="reconstruction", sigma=1, dtype=float,
+                        out=None, counts=None, **kwargs):
+    """ `img` as float, smoothed by a Gaussian of `sigma`, minus its background
+
+    `method` names an engine in ENGINES; `kwargs` are passed on to it.
+    Engines working in intensity counts get `counts`, by default from the
+    dtype of an integer `img` (see `intensity_counts`); for float images
+    without `counts` the engine's own default applies.
+    The result is computed in `dtype`, in `out` if given.
+    """
+    try:
+        engine = ENGINES[method]
+    except KeyError:
+        raise ValueError(f"unknown background method '{method}'") from None
+    if engine.usesCounts:
+        if counts is None:
+            counts = intensity_counts(img)
+        if counts is not None:
+            kwargs["counts"] = counts
+    image = smooth_float(img, sigma, dtype=dtype, out=out)
+    image -= engine(image, **kwargs)
+    return image
+
+def reconstruct_background(img, sigma=1):
+    """ smoothed `img` minus its reconstruction by dilation from the border """
+    return subtract_background(img, "reconstruction", sigma)
+
+@register_engine("reconstruction")
+def reconstruction_background(image):
+    """ reconstruction by dilation seeded from the border; https://bit.ly/3li6ity
+
+    The reference engine: everything not connected to the border by a
+    path at least as bright is foreground, regardless of its size.
+    """
+    seed = np.copy(image)
+    seed[1:-1, 1:-1] = image.min()
+    return reconstruction(seed, image, method='dilation')
+
+@register_engine("tophat")
+def opening_background(image, radius=8):
+    """ grey opening with a (2*radius+1) square, as separable min/max filters
+
+    Removes bright features narrower than the square (a white top-hat).
+    """
+    size = 2*radius + 1
+    return ndimage.maximum_filter(ndimage.minimum_filter(image, size), size)
+
+@register_engine("paraboloid", counts=True)
+def paraboloid_background(image, radius=25, shrink=4, counts=65535):
+    """ sliding paraboloid (rolling-ball approximation) on a shrunk image
+
+    The image is shrunk by block minima of `shrink` pixels, opened with a
+    paraboloid of the curvature of a ball of `radius` pixels (intensity in
+    counts of the original image, as ImageJ; `counts` per unit of `image`,
+    by default 16-bit images scaled to [0, 1]), and expanded back by linear
+    interpolation. The paraboloid is separable, so the opening runs along
+    rows, then columns.
+    """
+    small = block_reduce(image, shrink, np.minimum)
+    r = max(radius / shrink, 1)
+    d = np.arange(-int(np.ceil(r)), int(np.ceil(r)) + 1) * shrink
+    profile = -d**2 / (2 * radius * counts)
+    kernels = (profile[:, None], profile[None, :])
+    for k in kernels:
+        small = ndimage.grey_erosion(small, structure=k)
+    for k in kernels:
+        small = ndimage.grey_dilation(small, structure=k)
+    return np.minimum(expand(small, image.shape, shrink), image)
+
+@register_engine("gaussian")
+def gaussian_background(image, sigma=20, shrink=4):
+    """ Gaussian of a large `sigma`, computed on a `shrink` times smaller image """
+    counts = [np.diff(np.append(np.arange(0, n, shrink), n)) for n in image.shape]
+    small = block_reduce(image, shrink, np.add) / np.outer(*counts)
+    small = ndimage.gaussian_filter(small, sigma / shrink, mode="nearest")
+    return expand(small, image.shape, shrink)
+
+def block_reduce(image, factor, ufunc=np.minimum):
+    """ `ufunc` over `factor` square blocks (partial blocks at the edges) """
+    if factor == 1:
+        return image.copy()
+    rows = ufunc.reduceat(image, np.arange(0, image.shape[0], factor), axis=0)
+    return ufunc.reduceat(rows, np.arange(0, image.shape[1], factor), axis=1)
+
+def expand(small, shape, factor):
+    """ linear interpolation of block values back to full `shape` """
+    if factor == 1:
+        return small
+    for axis, n in enumerate(shape):
+        m = small.shape[axis]
+        pos = np.clip((np.arange(n) + 0.5) / factor - 0.5, 0, m - 1)
+        i0 = np.minimum(pos.astype(int), max(m - 2, 0))
+        w = (pos - i0).reshape((-1, 1) if axis == 0 else (1, -1))
+        a, b = np.take(small, i0, axis=axis), np.take(small, np.minimum(i0 + 1, m - 1), axis=axis)
+        small = a + w * (b - a)
+    return small
+
+
+# ==============================================================================
+# tiles
+# ==============================================================================
+def tile_slices(shape, tileSize):
+    """ (rows, cols) slices of the tiles covering `shape`, row by row """
+    return [(slice(r, min(r + tileSize, shape[0])), slice(c, min(c + tileSize, shape[1])))
+            for r in range(0, shape[0], tileSize) for c in range(0, shape[1], tileSize)]
+
+def grow(tile, halo, shape):
+    """ `tile` grown by `halo` pixels within `shape`, and the tile inside it """
+    rows, cols = tile
+    r0, c0 = max(rows.start - halo, 0), max(cols.start - halo, 0)
+    r1, c1 = min(rows.stop + halo, shape[0]), min(cols.stop + halo, shape[1])
+    inner = (slice(rows.start - r0, rows.stop - r0), slice(cols.start - c0, cols.stop - c0))
+    return (slice(r0, r1), slice(c0, c1)), inner
+
+def reconstruct_background_tiled(img, sigma=1, tileSize=512, workers=None,
+                                 out=None, executor=None, dtype=float):
+    """ `reconstruct_background` tile by tile, in bounded memory
+
+    Tiles are smoothed with a halo as wide as the Gaussian kernel, so that
+    step is exact. The reconstruction then propagates between tiles: each
+    tile is reconstructed from the current marker plus a 1-pixel halo of
+    its neighbours, and the neighbours of every tile whose edge changed
+    are redone until nothing changes. This converges to the global
+    reconstruction rather than approximating it.
+
+    Only the output and the marker are image-sized. With `workers`, tiles
+    are processed on a process pool and both arrays are memory-mapped.
+    `out` can be a preallocated float array, an np.memmap or the name of
+    a .npy file to create; it and the marker are of `dtype`. Returns the
+    corrected image (`out`).
+    """
+    shape = img.shape
+    if isinstance(out, (str, Path)):
+        out = np.lib.format.open_memmap(str(out), mode="w+", dtype=dtype, shape=shape)
+    elif out is None:
+        out = np.empty(shape, dtype=dtype)
+    tiles = tile_slices(shape, tileSize)
+    nCols = -(-shape[1] // tileSize)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def scratch(name, dtype=out.dtype):
+            return np.memmap(str(Path(tmp) / name), dtype=dtype, mode="w+", shape=shape)
+
+        onDisk = workers is not None or executor is not None
+        mask = out if isinstance(out, np.memmap) or not onDisk else scratch("mask")
+        marker = scratch("marker") if onDisk or isinstance(out, np.memmap) \
+            else np.empty(shape, dtype=out.dtype)
+        src = img
+        if onDisk and not isinstance(img, np.memmap):
+            src = scratch("img", img.dtype)
+            for tile in tiles:
+                src[tile] = img[tile]
+
+        pool = get_executor(workers, executor) if onDisk else None
+        try:
+            def run(func, *args):
+                if pool is None:
+                    return [func(*a) for a in zip(*args)]
+                args = [[_spec(x) if isinstance(x, np.memmap) else x for x in a] for a in args]
+                return list(pool.map(func, *args))
+
+            n = len(tiles)
+            halo = int(4.0 * sigma + 0.5)
+            f = next(d for d in range(max(tileSize // 32, 1), 0, -1) if tileSize % d == 0)
+            mins = run(_smooth_tile, [src]*n, [mask]*n, tiles, [sigma]*n, [halo]*n, [f]*n)
+
+            # marker: the image on its border, inside a lower bound from the
+            # reconstruction of the block minima, which saves most sweeps
+            nRows = -(-shape[0] // tileSize)
+            coarse = np.block([[mins[i*nCols + j] for j in range(nCols)] for i in range(nRows)])
+            seed = np.copy(coarse)
+            seed[1:-1, 1:-1] = coarse.min()
+            coarse = reconstruction(seed, coarse, method="dilation")
+            for rows, cols in tiles:
+                block = coarse[rows.start//f:-(-rows.stop//f), cols.start//f:-(-cols.stop//f)]
+                block = np.repeat(np.repeat(block, f, axis=0), f, axis=1)
+                marker[rows, cols] = block[:rows.stop - rows.start, :cols.stop - cols.start]
+            marker[0], marker[-1] = mask[0], mask[-1]
+            marker[:, 0], marker[:, -1] = mask[:, 0], mask[:, -1]
+
+            active = list(range(n))
+            while active:
+                changed = run(_reconstruct_tile, [mask]*len(active), [marker]*len(active),
+                              [tiles[k] for k in active])
+                after = set()
+                for k, edge in zip(active, changed):
+                    if edge:
+                        i, j = divmod(k, nCols)
+                        after.update(a*nCols + b for a in range(max(i-1, 0), min(i+2, nRows))
+                                     for b in range(max(j-1, 0), min(j+2, nCols)) if (a, b) != (i, j))
+                after = sorted(after)
+                grows = run(_can_grow, [mask]*len(after), [marker]*len(after),
+                            [tiles[k] for k in after])
+                active = [k for k, g in zip(after, grows) if g]
+        finally:
+            if pool is not None and executor is None:
+                pool.shutdown()
+
+        for tile in tiles:
+            out[tile] = mask[tile] - marker[tile]
+        if isinstance(out, np.memmap):
+            out.flush()
+        del mask, marker, src
+    return out
+
+def _spec(a):
+    """ picklable reference to a memory-mapped array """
+    return (a.filename, a.offset, a.shape, a.dtype.str)
+
+def _open(a, mode="r+"):
+    if isinstance(a, tuple):
+        filename, offset, shape, dtype = a
+        return np.memmap(filename, dtype=dtype, mode=mode, offset=offset, shape=shape)
+    return a
+
+def _smooth_tile(src, dst, tile, sigma, halo, factor):
+    """ smooth one tile; returns its minima over `factor` square blocks """
+    src, dst = _open(src, "r"), _open(dst)
+    win, inner = grow(tile, halo, src.shape)
+    smooth = smooth_float(src[win], sigma, dtype=dst.dtype)[inner]
+    dst[tile] = smooth
+    blocks = np.minimum.reduceat(smooth, np.arange(0, smooth.shape[0], factor), axis=0)
+    return np.minimum.reduceat(blocks, np.arange(0, smooth.shape[1], factor), axis=1)
+
+def _reconstruct_tile(mask, marker, tile):
+    """ reconstruct one tile in place; True if its edge pixels changed """
+    mask, marker = _open(mask, "r"), _open(marker)
+    win, inner = grow(tile, 1, mask.shape)
+    before = _edges(np.array(marker[tile]))
+    rec = reconstruction(np.array(marker[win]), np.array(mask[win]), method="dilation")[inner]
+    marker[tile] = rec
+    return not np.array_equal(_edges(rec), before)
+
+def _can_grow(mask, marker, tile):
+    """ True if one dilation step from the halo would raise the tile """
+    mask, marker = _open(mask, "r"), _open(marker, "r")
+    win, inner = grow(tile, 1, mask.shape)
+    step = np.minimum(ndimage.grey_dilation(np.array(marker[win]), size=3), mask[win])
+    return bool((step[inner] > marker[tile]).any())
+
+def _edges(a):
+    return np.concatenate((a[0], a[-1], a[:, 0], a[:, -1]))
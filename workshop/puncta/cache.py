@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> cache
+"""
+
+import json
+import hashlib
+import numpy as np
+import h5py
+from collections import OrderedDict
+
+# one row per cached fit, least recently used first; (x, y, sig) are the
+# fitted center and width relative to the fit window, status is as in the
+# cell table: -1 not reported (eg. mode "zoom"), 0 failed, 1 converged
+CACHE_DTYPE = np.dtype([("key", "S32"), ("x", "f8"), ("y", "f8"), ("sig", "f8"),
+                        ("status", "i1")])
+
+
+def fit_key(img, seed, settings):
+    """ content hash of a fit's input
+
+    `img` is the fit window, `seed` the starting punctum (x, y, r) in its
+    coordinates (NaN for none) and `settings` a dict of fit options.
+    """
+    img = np.ascontiguousarray(img)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{img.shape}{img.dtype.str}".encode())
+    h.update(img.tobytes())
+    h.update(np.asarray(seed, dtype=float).tobytes())
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return h.hexdigest().encode()
+
+
+class FitCache():
+    """ fit results keyed by `fit_key`, least recently used evicted first
+
+    Holds at most `maxEntries` results in memory. With a `filename`, the
+    cache is read from dataset `name` of that HDF5 file (a sidecar, or the
+    FOV file itself after it is saved) and written back by `flush`, or on
+    leaving a `with` block.
+    """
+
+    def __init__(self, filename=None, name="fitcache", maxEntries=2**20):
+        self.filename = filename
+        self.name = name
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._fits = OrderedDict()
+        if filename is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self._fits)
+
+    def __contains__(self, key):
+        return key in self._fits
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def __str__(self):
+        return (f"FitCache [{len(self)} fits, {self.hits} hits, {self.misses} misses]")
+
+    def get(self, key):
+        """ cached (x, y, sig, status) for `key`, or None """
+        try:
+            value = self._fits.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._fits[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._fits.pop(key, None)
+        self._fits[key] = tuple(value)
+        while len(self._fits) > self.maxEntries:
+            self._fits.popitem(last=False)
+
+    def clear(self):
+        self._fits.clear()
+        self.hits = self.misses = 0
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0}
+
+    # ==========================================================================
+    # disk
+    # ==========================================================================
+    def load(self):
+        """ read the entries of the HDF5 file; tables in another layout are ignored """
+        try:
+            with h5py.File(self.filename, "r") as HF:
+                if self.name not in HF or HF[self.name].dtype != CACHE_DTYPE:
+                    return
+                table = HF[self.name][()]
+        except FileNotFoundError:
+            return
+        for key, x, y, sig, status in zip(table["key"].tolist(), table["x"].tolist(),
+                                          table["y"].tolist(), table["sig"].tolist(),
+                                          table["status"].tolist()):
+            self.put(key, (x, y, sig, status))
+
+    def flush(self):
+        """ write all entries, oldest first, to the HDF5 file """
+        if self.filename is None:
+            return
+        table = np.array([(key,) + value for key, value in self._fits.items()],
+                         dtype=CACHE_DTYPE)
+        with h5py.File(self.filename, "a") as HF:
+            if self.name in HF:
+                del HF[self.name]
+            HF.create_dataset(self.name, data=table, maxshape=(None,),
+                              chunks=(min(max(len(table), 1), 4096),),
+                              compression="gzip", shuffle=True)
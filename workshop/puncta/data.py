@@ -6,21 +6,67 @@ puncta >> data
 import numpy as np
 from scipy import ndimage
 from datetime import datetime
-import h5py, json
+import h5py, json, time, tracemalloc, uuid
 
 from skimage import io, filters
-from skimage import img_as_float
-from skimage.morphology import reconstruction
+from skimage.color import rgb2gray, rgba2rgb
 
 import matplotlib.pyplot as plt
 
 from . import Circle
+from .fitting import stack_windows, moment_guess, fit_windows
+from .parallel import fit_cells, BATCH_MODES
+from .detection import find_spots, assign_to_rois
+from .background import subtract_background, reconstruct_background_tiled
+from .storage import ChunkCache, LazyImage
+from .cache import fit_key
+from .instrument import INSTRUMENT
+
+# one row per cell; puncta columns are NaN without a punctum, status is the
+# fit convergence: -1 not fit, 0 failed, 1 converged
+CELL_DTYPE = np.dtype([("id", "S64"), ("coords", "i8", (4,)), ("x", "f8"),
+                       ("y", "f8"), ("r", "f8"), ("status", "i1")])
+
+# labels of instrumented stages (see `instrument.Instrument.timed`)
+def _file_labels(cls, filename, *args, **kwargs):
+    return {"file": str(filename)}
+
+def _fov_labels(fov, *args, **kwargs):
+    return {"fov": str(fov._id)}
+
+def _cell_labels(cell, *args, **kwargs):
+    return {"cell": str(cell._id)}
+
+def encode_ids(ids, field=CELL_DTYPE["id"]):
+    """ ids as bytes for the string `field` of a table dtype
+
+    numpy silently truncates strings longer than the field, so such ids
+    are refused instead.
+    """
+    encoded = [str(id_).encode() for id_ in ids]
+    for key in encoded:
+        if len(key) > field.itemsize:
+            raise ValueError(f"id '{key.decode()}' is longer than {field.itemsize} bytes")
+    return encoded
+
+def new_id():
+    """ FOV id: hex timestamp plus a random suffix, unique within a second """
+    return f"{hex(int(datetime.now().timestamp()))}-{uuid.uuid4().hex[:8]}"
 
 class FOV():
+    """ field of view: the raw image, its background-corrected copy and cells
 
-    def __init__(self, img, corrImg=None, id_=None, cells=None):
+    The raw image keeps its own dtype (eg. uint16 from the camera); the
+    corrected image is computed in `dtype`, float64 or float32. `counts`
+    are the intensity counts in one unit of a float raw image, eg. 255 for
+    a color image read from 8 bits; None for integer raw images, which
+    carry them in their dtype (see `background.intensity_counts`).
+    """
+
+    def __init__(self, img, corrImg=None, id_=None, cells=None, dtype=np.float64,
+                 counts=None):
         if id_ is None:
-            self._id = hex(int(datetime.now().timestamp()))
+            self._id = new_id()
         else:
             self._id = id_
         self._img = img
@@ -33,6 +79,9 @@ class FOV():
             self._cells = []
         else:
             self._cells = cells
+        self._file = None
+        self.dtype = np.dtype(dtype)
+        self.counts = counts
 
     def __getitem__(self, index):
         return self._cells[index]
@@ -43,48 +92,248 @@ class FOV():
     def __str__(self):
         return f"Field of View {self._id}\t[{len(self)} selected cells]"
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ close the file behind a lazily loaded FOV """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
     def add_cell(self, coords):
         self._cells.append(Cell(self, coords))
         print("added ", self[-1])
 
     @classmethod
-    def read_image(cls, filename):
-        img = io.imread(filename, as_gray=True)
-        id_ = hex(int(datetime.now().timestamp()))
-        return cls(img, id_)
+    @INSTRUMENT.timed("read_image", labels=_file_labels)
+    def read_image(cls, filename, dtype=np.float64):
+        """ FOV of an image file
+
+        Color images are converted to gray floats in [0, 1], as by
+        `io.imread(as_gray=True)`, keeping the counts of their dtype.
+        """
+        img = io.imread(filename)
+        counts = None
+        if img.ndim > 2:
+            if img.dtype.kind in "ui":
+                counts = np.iinfo(img.dtype).max
+            img = rgb2gray(rgba2rgb(img) if img.shape[2] == 4 else img)
+        return cls(img, id_=new_id(), dtype=dtype, counts=counts)
+
+    @classmethod
+    @INSTRUMENT.timed("load", labels=_file_labels)
+    def load(cls, filename, lazy=False, cacheBytes=256*2**20):
+        """ read a FOV saved by `save`
+
+        With `lazy`, the file stays open and both images are `LazyImage`s
+        of the stored dataset: only the chunks under a cell's ROI are read
+        when its `img` is used, through an LRU cache of up to `cacheBytes`
+        decompressed bytes. Close the file with `close` or a `with` block.
+        """
+        HF = h5py.File(filename, "r")
+        try:
+            fov = cls.read(HF, lazy=lazy, cacheBytes=cacheBytes)
+        except Exception:
+            HF.close()
+            raise
+        if lazy:
+            fov._file = HF
+        else:
+            HF.close()
+        return fov
 
     @classmethod
-    def load(cls, filename):
-        with h5py.File(filename, "r") as HF:
-            id_ = HF.attrs["id"]
-            data = HF["FOV"]
-            corrImg = data[:,:,0]
-            img = data[:,:,1]
-            fov = cls(img, corrImg=corrImg, id_=id_, cells=None)
-            cells = []
-            for key, item in HF["cells"].attrs.items():
-                cells.append(Cell.from_json(fov, key, item))
-            fov._cells = cells
-            return fov
-
-    def save(self, filename):
+    def read(cls, group, lazy=False, cacheBytes=256*2**20):
+        """ FOV stored by `write` in an open HDF5 file or group; see `load` """
+        cache = ChunkCache(cacheBytes)
+        if "FOV" in group:
+            # files written before separate datasets: both images stacked
+            data = group["FOV"]
+            if lazy:
+                corrImg, img = LazyImage(data, 0, cache), LazyImage(data, 1, cache)
+            else:
+                corrImg = data[:,:,0]
+                img = data[:,:,1]
+        elif lazy:
+            corrImg = LazyImage(group["corrected"], cache=cache)
+            img = LazyImage(group["raw"], cache=cache)
+        else:
+            corrImg, img = group["corrected"][()], group["raw"][()]
+        fov = cls(img, corrImg=corrImg, id_=group.attrs["id"], cells=None,
+                  dtype=corrImg.dtype if corrImg.dtype.kind == "f" else np.float64,
+                  counts=group.attrs.get("counts"))
+        if isinstance(group["cells"], h5py.Group):
+            # files written before the cell table: one JSON attribute per cell
+            fov._cells = [Cell.from_json(fov, key, item)
+                          for key, item in group["cells"].attrs.items()]
+        else:
+            fov._cells = Cell.from_table(fov, group["cells"][()])
+        return fov
+
+    @INSTRUMENT.timed("save", labels=_fov_labels)
+    def save(self, filename, compression="gzip", chunkSize=128):
+        """ write the FOV to its own HDF5 file; see `write` """
         with h5py.File(filename, "w") as HF:
-            HF.attrs["id"] = self._id
-            data = np.stack((self.img, self._img), axis=2)
-            HF.create_dataset("FOV", data=data, compression="gzip")
-            group = HF.create_group("cells")
-            for cell in self:
-                group.attrs[str(cell._id)] = cell.as_json()
-
-    def correct_background(self, show=False):
-        """ https://bit.ly/3li6ity """
-        image = img_as_float(self._img)
-        image = ndimage.gaussian_filter(image, 1)
-        seed = np.copy(image)
-        seed[1:-1, 1:-1] = image.min()
-        mask = image
-        dilated = reconstruction(seed, mask, method='dilation')
-        self.img = image - dilated
+            self.write(HF, compression=compression, chunkSize=chunkSize)
+
+    def write(self, group, compression="gzip", chunkSize=128):
+        """ write both images and the cell table (CELL_DTYPE rows) into `group`
+
+        The raw and corrected images are separate datasets, each in its own
+        dtype, stored in `chunkSize` square tiles so a lazy load reads a
+        cell's ROI from a few chunks. `compression` is any h5py filter;
+        "lzf" is several times faster than "gzip" for somewhat larger files.
+        """
+        group.attrs["id"] = self._id
+        if self.counts is not None:
+            group.attrs["counts"] = self.counts
+        for name, img in (("raw", self._img), ("corrected", self.img)):
+            chunks = (min(chunkSize, img.shape[0]), min(chunkSize, img.shape[1]))
+            group.create_dataset(name, data=img, chunks=chunks, compression=compression,
+                                 shuffle=compression is not None)
+        self.write_cells(group)
+
+    def write_cells(self, group):
+        """ (re)write only the cell table in `group` """
+        table = Cell.to_table(self)
+        if "cells" in group:
+            del group["cells"]
+        group.create_dataset("cells", data=table, maxshape=(None,),
+                             chunks=(min(max(len(table), 1), 4096),),
+                             compression="gzip", shuffle=True)
+
+    @INSTRUMENT.timed("detect_puncta", labels=_fov_labels)
+    def detect_puncta(self, sigma=1.5, method="dog", threshold=None, minDistance=3,
+                      otsu=None, newCells=True, halfWidth=10, report=False):
+        """ find candidate puncta across the whole image and seed cells
+
+        Candidates are local maxima of a band-pass filtered `img`; see
+        `detection.find_spots` for the parameters. Every cell is seeded
+        with the strongest candidate inside its ROI. With `newCells`, each
+        candidate outside all ROIs gets a new cell reaching `halfWidth`
+        pixels around it. Seeds have r = 1.5*sigma, as fits report it.
+        With `report`, prints the number of candidates.
+        Returns the (x, y) candidates in image coordinates.
+        """
+        x, y, _ = find_spots(self.img, sigma=sigma, method=method, threshold=threshold,
+                             minDistance=minDistance, otsu=otsu)
+        r = 1.5*sigma
+        best, inAny = assign_to_rois(x, y, [cell._coords for cell in self])
+        for cell, k in zip(self, best):
+            if k >= 0:
+                c1, _, r1, _ = cell._coords
+                cell.punctum = Circle(float(x[k] - c1), float(y[k] - r1), r=r)
+        if newCells:
+            H, W = self.img.shape
+            for xi, yi in zip(x[~inAny].tolist(), y[~inAny].tolist()):
+                coords = [max(xi - halfWidth, 0), min(xi + halfWidth + 1, W),
+                          max(yi - halfWidth, 0), min(yi + halfWidth + 1, H)]
+                cell = Cell(self, coords)
+                cell.punctum = Circle(float(xi - coords[0]), float(yi - coords[2]), r=r)
+                self._cells.append(cell)
+        if report:
+            print(f"detected {len(x)} puncta in {self}")
+        return np.column_stack((x, y))
+
+    @INSTRUMENT.timed("fit_all_puncta", labels=_fov_labels)
+    def fit_all_puncta(self, model="circle", mode="native", blockSize=256,
+                       workers=None, cache=None, **kwargs):
+        """ fit a Gaussian punctum in every cell in one batched solve
+
+        With mode "native" each seeded cell is fit in a native-pixel window
+        around its punctum (see `Cell.get_window`); with "crop", and for
+        cells without a punctum, the whole cell crop is fit. Windows are
+        stacked in blocks of `blockSize` cells and fit together; see
+        `fitting.fit_gaussians`. Existing puncta seed the center, otherwise
+        it starts from the window's moments. With `workers`, blocks are fit
+        on a process pool (see `parallel.fit_cells`). With a `cache.FitCache`,
+        cells whose window, seed and settings were fit before take the
+        cached result and only the rest are fit.
+        Converged cells get a new punctum; returns the convergence flags.
+        """
+        if mode not in BATCH_MODES:
+            raise ValueError(f"unknown fit mode '{mode}'")
+        cells = list(self)
+        converged = np.zeros(len(cells), dtype=bool)
+        todo = np.arange(len(cells))
+        if cache is not None:
+            settings = {"model": model, "mode": mode, **kwargs}
+            keys = [cell.fit_key(settings, native=(mode == "native")) for cell in cells]
+            hits = [cache.get(key) for key, _, _ in keys]
+            for i, (cell, (_, c0, r0), hit) in enumerate(zip(cells, keys, hits)):
+                if hit is not None:
+                    cell.set_cached_fit(hit, origin=(c0, r0))
+                    converged[i] = hit[3] > 0
+            todo = np.array([i for i, hit in enumerate(hits) if hit is None], dtype=int)
+
+        if workers is not None:
+            converged[todo] = fit_cells([cells[i] for i in todo], workers=workers,
+                                        chunkSize=blockSize, model=model, mode=mode,
+                                        **kwargs)
+        else:
+            for start in range(0, len(todo), blockSize):
+                block = [cells[i] for i in todo[start:start+blockSize]]
+                windows = [cell.get_window(native=(mode == "native")) for cell in block]
+                seeds = [np.subtract(cell.get_seed(), (c0, r0))
+                         for cell, (_, c0, r0) in zip(block, windows)]
+                params, ok = fit_windows([w[0] for w in windows], seeds=seeds,
+                                         model=model, **kwargs)
+                for cell, (_, c0, r0), beta, flag in zip(block, windows, params, ok):
+                    cell.set_fit(beta, flag, origin=(c0, r0))
+                converged[todo[start:start+blockSize]] = ok
+
+        if cache is not None:
+            for i in todo:
+                key, c0, r0 = keys[i]
+                cache.put(key, cells[i].get_cached_fit(origin=(c0, r0)))
+        return converged
+
+    @INSTRUMENT.timed("correct_background", labels=_fov_labels)
+    def correct_background(self, show=False, method="reconstruction", tileSize=None,
+                           workers=None, out=None, inplace=False, report=False,
+                           **kwargs):
+        """ subtract the background of the smoothed raw image
+
+        `method` names an engine in `background.ENGINES`: "reconstruction"
+        (the reference, https://bit.ly/3li6ity), "tophat", "paraboloid" or
+        "gaussian"; `kwargs` are passed on to it, `counts` by default the
+        FOV's (see `background.subtract_background`). With `tileSize`, the
+        reconstruction runs tile by tile in bounded memory (see
+        `background.reconstruct_background_tiled`), optionally on `workers`
+        processes and into a preallocated or memory-mapped `out`. The
+        result is computed in the FOV's `dtype`, into a new array unless
+        `out` is given. With `inplace`, the current corrected image is
+        overwritten instead if it is a separate buffer of the right shape
+        and dtype; arrays taken from it before, eg. `Cell.img`, then change
+        too. With `report`, prints the time taken and the peak memory
+        traced in this process.
+        """
+        if tileSize is not None and method != "reconstruction":
+            raise ValueError("tiled background correction needs method 'reconstruction'")
+        tracing = report and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        if out is None and inplace:
+            out = self._buffer()
+        if tileSize is None:
+            kwargs.setdefault("counts", self.counts)
+            self.img = subtract_background(self._img, method, dtype=self.dtype,
+                                           out=out, **kwargs)
+        else:
+            self.img = reconstruct_background_tiled(self._img, tileSize=tileSize,
+                                                    workers=workers, out=out,
+                                                    dtype=self.dtype)
+        if report:
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            print(f"background corrected in {time.perf_counter() - t0:.2f} s, "
+                  f"peak {peak:.0f} MB traced")
+        if tracing:
+            tracemalloc.stop()
 
         if show:
             ax1 = plt.subplot(1, 2, 1)
@@ -97,6 +346,15 @@ class FOV():
             ax2.axis('off')
             plt.show()
 
+    def _buffer(self):
+        """ the corrected image, if it can be overwritten with a new one """
+        img = self.img
+        if isinstance(img, np.ndarray) and img.shape == np.shape(self._img) \
+                and img.dtype == self.dtype and img.flags.writeable \
+                and not np.may_share_memory(img, self._img):
+            return img
+        return None
+
     # def threshhold(self, show=False):
     #     """ https://bit.ly/2FUW3eI """
     #     thresholds = filters.threshold_multiotsu(self.img, classes=3)
@@ -125,6 +383,7 @@ class Cell():
             self._id = id_
         self._coords = coords
         self.punctum = punctum
+        self.converged = None
 
     def as_json(self):
         try:
@@ -139,6 +398,34 @@ class Cell():
     def __str__(self):
         return f"Cell {self._id}"
 
+    @staticmethod
+    def to_table(cells):
+        """ CELL_DTYPE record array of `cells` """
+        cells = list(cells)
+        table = np.zeros(len(cells), dtype=CELL_DTYPE)
+        table["id"] = encode_ids(cell._id for cell in cells)
+        table["coords"] = np.reshape([cell._coords for cell in cells], (-1, 4))
+        xyr = [(np.nan,)*3 if cell.punctum is None else
+               (cell.punctum.x, cell.punctum.y, cell.punctum.r) for cell in cells]
+        table["x"], table["y"], table["r"] = np.reshape(xyr, (-1, 3)).T
+        table["status"] = [-1 if cell.converged is None else int(cell.converged)
+                           for cell in cells]
+        return table
+
+    @classmethod
+    def from_table(cls, parent, table):
+        """ list of cells from the rows of a CELL_DTYPE record array """
+        cells = []
+        for id_, coords, x, y, r, status in zip(np.char.decode(table["id"]).tolist(),
+                                                table["coords"].tolist(),
+                                                table["x"].tolist(), table["y"].tolist(),
+                                                table["r"].tolist(), table["status"].tolist()):
+            p = None if np.isnan(x) else Circle(x, y, r=r)
+            cell = cls(parent, coords, id_, p)
+            cell.converged = None if status < 0 else bool(status)
+            cells.append(cell)
+        return cells
+
     @classmethod
     def from_json(cls, parent, key, data):
         d = json.loads(data)
@@ -152,11 +439,93 @@ class Cell():
         y1, y2, x1, x2 = self._coords
         return self._parent.img[x1:x2, y1:y2]
 
+    def get_seed(self):
+        """ punctum center to start fitting from, NaN if there is none """
+        if self.punctum is None:
+            return np.nan, np.nan
+        return self.punctum.x, self.punctum.y
+
+    def get_window(self, native=True, scale=2.0, minHalfWidth=3):
+        """ native-pixel window around the punctum and its (col, row) origin
+
+        The window reaches `scale` punctum radii (about 3 sigma) from the
+        seed on each side. The whole crop is returned if there is no
+        punctum or `native` is False.
+        """
+        img = self.img
+        if not native or self.punctum is None:
+            return img, 0, 0
+        half = max(minHalfWidth, int(np.ceil(scale * self.punctum.r)))
+        col, row = int(round(self.punctum.x)), int(round(self.punctum.y))
+        c0, r0 = max(col - half, 0), max(row - half, 0)
+        return img[r0:row+half+1, c0:col+half+1], c0, r0
+
+    def set_fit(self, beta, converged, origin=(0, 0)):
+        """ store fit parameters (A, muX, muY, sig[, sigY]) of a window at `origin` """
+        self.converged = bool(converged)
+        if converged:
+            self.punctum = Circle(origin[0] + beta[1], origin[1] + beta[2],
+                                  r=np.mean(beta[3:])*1.5)
+
+    def fit_key(self, settings, native=True):
+        """ `cache.fit_key` of the fit window and seed, and the window origin """
+        win, c0, r0 = self.get_window(native=native)
+        if self.punctum is None:
+            seed = (np.nan,) * 3
+        else:
+            seed = (self.punctum.x - c0, self.punctum.y - r0, self.punctum.r)
+        return fit_key(win, seed, settings), c0, r0
+
+    def get_cached_fit(self, origin=(0, 0)):
+        """ (x, y, sig, status) of the punctum relative to `origin`, to cache
+
+        status is -1 if the fit reported no convergence, else 0 or 1.
+        """
+        status = -1 if self.converged is None else int(self.converged)
+        if self.punctum is None:
+            return np.nan, np.nan, np.nan, status
+        return (self.punctum.x - origin[0], self.punctum.y - origin[1],
+                self.punctum.r / 1.5, status)
+
+    def set_cached_fit(self, value, origin=(0, 0)):
+        """ restore the state `get_cached_fit` cached after a fit """
+        x, y, sig, status = value
+        if status < 0:
+            self.converged = None
+            if np.isfinite(x):
+                self.punctum = Circle(origin[0] + x, origin[1] + y, r=sig*1.5)
+        else:
+            self.set_fit((np.nan, x, y, sig), status > 0, origin=origin)
+
     def add_punctum(self, initCoords, r=2):
         x, y = initCoords
         self.punctum = Circle(x, y, r=r)
 
-    def fit_punctum(self, show=False, isTesting=True):
+    @INSTRUMENT.timed("fit_punctum", labels=_cell_labels)
+    def fit_punctum(self, show=False, isTesting=True, mode="zoom", cache=None):
+        """ refine the punctum by fitting a 2D Gaussian around it
+
+        mode "zoom" fits a 40x40 window of the 3x spline-upsampled crop;
+        "native" fits a window of the crop itself sized from the punctum
+        radius (see `get_window`) and "centroid" only takes the centroid
+        and size of the half-maximum region in that window. With a
+        `cache.FitCache`, an unchanged window and seed reuse the last fit.
+        """
+        if cache is not None:
+            key, c0, r0 = self.fit_key({"model": "circle", "mode": mode},
+                                       native=(mode != "zoom"))
+            hit = cache.get(key)
+            if hit is not None:
+                self.set_cached_fit(hit, origin=(c0, r0))
+            else:
+                self._fit_punctum(show, isTesting, mode)
+                cache.put(key, self.get_cached_fit(origin=(c0, r0)))
+        else:
+            self._fit_punctum(show, isTesting, mode)
+
+    def _fit_punctum(self, show, isTesting, mode):
+        if mode != "zoom":
+            return self._fit_native(mode)
         if isTesting:
             plt.imshow(self.img, cmap="afmhot")
             plt.show()
@@ -167,7 +536,7 @@ class Cell():
             plt.show()
         # crop upsampled image near initial point
         # initCoords = np.array(initCoords, dtype=np.int)*3
-        initCoords = np.array([self.punctum.x, self.punctum.y], dtype=np.int)*3
+        initCoords = np.array([self.punctum.x, self.punctum.y], dtype=int)*3
         r = self.punctum.r
         ylim = slice(initCoords[0]-20, initCoords[0]+20)
         xlim = slice(initCoords[1]-20, initCoords[1]+20)
@@ -205,3 +574,17 @@ class Cell():
             plt.plot(*p.get_draw_coords(), c='c')
             plt.show()
         self.punctum = p
+
+    def _fit_native(self, mode):
+        win, c0, r0 = self.get_window()
+        x, y = self.get_seed()
+        if mode == "native":
+            params, ok = fit_windows([win], seeds=[(x - c0, y - r0)])
+            beta, ok = params[0], ok[0]
+        elif mode == "centroid":
+            stack, weights = stack_windows([win])
+            beta = moment_guess(stack, weights)[0]
+            ok = np.isfinite(beta).all() and beta[0] > 0
+        else:
+            raise ValueError(f"unknown fit mode '{mode}'")
+        self.set_fit(beta, ok, origin=(c0, r0))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> detection
+"""
+
+import numpy as np
+from scipy import ndimage
+from skimage import filters
+
+
+def spot_response(img, sigma=1.5, method="dog"):
+    """ band-pass filtered image, bright for spots of size `sigma`
+
+    Float images keep their precision, others are converted to float64.
+    "dog" is a difference of Gaussians (sigma, 1.6*sigma), "log" the
+    scale-normalized negative Laplacian of Gaussian.
+    """
+    img = np.asarray(img)
+    if img.dtype.kind != "f":
+        img = img.astype(float)
+    if method == "dog":
+        resp = ndimage.gaussian_filter(img, sigma)
+        resp -= ndimage.gaussian_filter(img, 1.6*sigma)
+        return resp
+    if method == "log":
+        return -sigma**2 * ndimage.gaussian_laplace(img, sigma)
+    raise ValueError(f"unknown detection method '{method}'")
+
+def otsu_mask(img, classes=3):
+    """ pixels in the brightest multi-Otsu class; https://bit.ly/2FUW3eI """
+    thresholds = filters.threshold_multiotsu(img, classes=classes)
+    return img >= thresholds[-1]
+
+def noise_level(resp, mask=None, k=3.0, iterations=5):
+    """ (mean, std) of the background of `resp`, sigma-clipped at `k`
+
+    Only pixels in `mask` are used, if any; spots are clipped away in up
+    to `iterations` rounds. The std is at least a few float epsilons of
+    the response range, so flat images do not give a zero threshold.
+    """
+    values = resp[mask] if mask is not None and mask.any() else resp.ravel()
+    keep = np.ones(values.shape, dtype=bool)
+    for _ in range(iterations):
+        mean, std = values[keep].mean(), values[keep].std()
+        clipped = np.abs(values - mean) < k*std
+        if not clipped.any() or (clipped == keep).all():
+            break
+        keep = clipped
+    floor = 8 * np.finfo(resp.dtype).eps * max(np.abs(resp).max(), 1e-300)
+    return float(mean), float(max(std, floor))
+
+def find_spots(img, sigma=1.5, method="dog", threshold=None, minDistance=3,
+               otsu=None, border=2):
+    """ candidate puncta: local maxima of the spot response
+
+    Maxima must be the largest value within `minDistance` pixels (non-
+    maximum suppression) and exceed `threshold`, by default 5 standard
+    deviations above the background of the response (see `noise_level`),
+    measured over the nonzero pixels of `img`: background subtraction by
+    reconstruction leaves most pixels exactly 0, which would otherwise
+    put the threshold at about 0. With `otsu`
+    (number of classes), candidates must also lie in the brightest
+    multi-Otsu class of `img`. Maxima within `border` pixels of the edge
+    are dropped.
+
+    Returns (x, y, response) arrays, x along columns, sorted by response,
+    strongest first.
+    """
+    resp = spot_response(img, sigma, method)
+    if threshold is None:
+        mean, std = noise_level(resp, mask=(np.asarray(img) != 0))
+        threshold = mean + 5*std
+    peaks = (ndimage.maximum_filter(resp, size=2*minDistance + 1) == resp) & (resp > threshold)
+    if otsu:
+        peaks &= otsu_mask(img, classes=otsu)
+    if border:
+        peaks[:border], peaks[-border:] = False, False
+        peaks[:, :border], peaks[:, -border:] = False, False
+
+    y, x = np.nonzero(peaks)
+    val = resp[y, x]
+    order = np.argsort(-val, kind="stable")
+    return x[order], y[order], val[order]
+
+def assign_to_rois(x, y, rois, blockSize=2**22):
+    """ first (strongest) point inside each ROI and the points inside any ROI
+
+    `rois` are cell coords [col1, col2, row1, row2]; points are assumed
+    sorted strongest first. Returns (index of point per ROI, -1 if none;
+    boolean mask of points inside at least one ROI).
+    """
+    rois = np.asarray(rois, dtype=float).reshape(-1, 4)
+    best = np.full(len(rois), -1)
+    inAny = np.zeros(len(x), dtype=bool)
+    step = max(1, blockSize // max(len(x), 1))
+    for start in range(0, len(rois), step):
+        c1, c2, r1, r2 = rois[start:start+step].T
+        inside = (x[:, None] >= c1) & (x[:, None] < c2) & (y[:, None] >= r1) & (y[:, None] < r2)
+        hit = inside.any(axis=0)
+        best[start:start+step] = np.where(hit, inside.argmax(axis=0), -1)
+        inAny |= inside.any(axis=1)
+    return best, inAny
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> fitting
+"""
+
+import numpy as np
+
+from .round_things import gau2d, gau2d_circle
+
+
+# ==============================================================================
+# models and analytic Jacobians
+# ==============================================================================
+def gau2d_jac(XX, A, muX, muY, sigX, sigY):
+    """ partial derivatives of `gau2d` w.r.t. (A, muX, muY, sigX, sigY) """
+    dx = XX[0] - muX
+    dy = XX[1] - muY
+    e = np.exp(-(dx**2/(2*sigX**2) + dy**2/(2*sigY**2)))
+    f = A * e
+    return np.stack((e,
+                     f * dx/sigX**2,
+                     f * dy/sigY**2,
+                     f * dx**2/sigX**3,
+                     f * dy**2/sigY**3), axis=-1)
+
+def gau2d_circle_jac(XX, A, muX, muY, sig):
+    """ partial derivatives of `gau2d_circle` w.r.t. (A, muX, muY, sig) """
+    J = gau2d_jac(XX, A, muX, muY, sig, sig)
+    return np.concatenate((J[..., :3], J[..., 3:4] + J[..., 4:5]), axis=-1)
+
+MODELS = {"circle": (gau2d_circle, gau2d_circle_jac),
+          "ellipse": (gau2d, gau2d_jac)}
+
+
+# ==============================================================================
+# batched fitting
+# ==============================================================================
+def stack_windows(imgs):
+    """ pad 2D images to a common shape
+
+    Returns the (N, H, W) stack and matching weights, 1 on real pixels
+    and 0 on padding.
+    """
+    H = max(i.shape[0] for i in imgs)
+    W = max(i.shape[1] for i in imgs)
+    stack = np.zeros((len(imgs), H, W))
+    weights = np.zeros((len(imgs), H, W))
+    for k, img in enumerate(imgs):
+        stack[k, :img.shape[0], :img.shape[1]] = img
+        weights[k, :img.shape[0], :img.shape[1]] = 1
+    return stack, weights
+
+def moment_guess(stack, weights, seeds=None, model="circle"):
+    """ starting parameters from the half-maximum region of each window
+
+    A is the peak height; the center is the intensity-weighted centroid of
+    the pixels above half maximum, unless a (x, y) seed is given (NaN for
+    none); sigma follows from the area of that region, pi*sig**2*2ln2.
+    """
+    N, H, W = stack.shape
+    YY, XX = np.mgrid[:H, :W]
+    z = np.where(weights > 0, stack, np.nan).reshape(N, -1)
+    base = np.nanmedian(z, axis=1)
+    top = np.nanmax(z, axis=1)
+    above = np.nan_to_num(z - ((top + base)/2)[:, None]) > 0
+    w = np.where(above, np.nan_to_num(z) - base[:, None], 0)
+    total = np.maximum(w.sum(axis=1), 1e-12)
+    muX = (w * XX.ravel()).sum(axis=1) / total
+    muY = (w * YY.ravel()).sum(axis=1) / total
+    if seeds is not None:
+        seeds = np.asarray(seeds, dtype=float)
+        hasSeed = np.isfinite(seeds).all(axis=1)
+        muX = np.where(hasSeed, seeds[:, 0], muX)
+        muY = np.where(hasSeed, seeds[:, 1], muY)
+    sig = np.sqrt(np.maximum(above.sum(axis=1), 1) / (2*np.pi*np.log(2)))
+    if model == "circle":
+        return np.column_stack((top, muX, muY, sig))
+    return np.column_stack((top, muX, muY, sig, sig))
+
+def fit_windows(imgs, seeds=None, model="circle", **kwargs):
+    """ pad, seed and fit a list of 2D images together; see `fit_gaussians` """
+    stack, weights = stack_windows(imgs)
+    p0 = moment_guess(stack, weights, seeds=seeds, model=model)
+    return fit_gaussians(stack, weights, p0, model=model, **kwargs)
+
+def fit_gaussians(stack, weights=None, p0=None, model="circle", maxIter=100,
+                  tol=1e-8):
+    """ Levenberg-Marquardt fit of one 2D Gaussian per window, all at once
+
+    `stack` is (N, H, W), `weights` (same shape) are per-pixel weights
+    (0 to ignore padding) and `p0` are (N, k) starting parameters, by
+    default from `moment_guess`. Every window keeps its own damping and
+    stops on its own once its relative cost change falls below `tol`.
+
+    Returns (params, converged), with parameters as for `gau2d_circle`
+    (model="circle") or `gau2d` (model="ellipse") in pixel units of the
+    window, x along columns and y along rows.
+    """
+    func, jac = MODELS[model]
+    N, H, W = stack.shape
+    if weights is None:
+        weights = np.ones_like(stack)
+    if p0 is None:
+        p0 = moment_guess(stack, weights, model=model)
+    YY, XX = np.mgrid[:H, :W]
+    coords = (XX.ravel()[None, :], YY.ravel()[None, :])
+    z = stack.reshape(N, -1)
+    w = weights.reshape(N, -1)
+
+    def cost_of(p, idx):
+        r = func(coords, *(p[:, [k]] for k in range(p.shape[1]))) - z[idx]
+        return r, (w[idx] * r**2).sum(axis=1)
+
+    p = np.array(p0, dtype=float)
+    lam = np.full(N, 1e-3)
+    r, cost = cost_of(p, np.arange(N))
+    active = np.ones(N, dtype=bool)
+    converged = np.zeros(N, dtype=bool)
+    eye = np.eye(p.shape[1])
+    for _ in range(maxIter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        J = jac(coords, *(p[idx][:, [k]] for k in range(p.shape[1])))
+        JW = J * w[idx, :, None]
+        JTJ = np.einsum("nki,nkj->nij", JW, J)
+        g = np.einsum("nki,nk->ni", JW, r[idx])
+        damp = JTJ * eye * lam[idx, None, None] + eye * 1e-12
+        try:
+            step = np.linalg.solve(JTJ + damp, -g[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = np.stack([np.linalg.lstsq(a, -b, rcond=None)[0]
+                             for a, b in zip(JTJ + damp, g)])
+
+        pNew = p[idx] + step
+        rNew, costNew = cost_of(pNew, idx)
+        better = np.isfinite(costNew) & (costNew <= cost[idx])
+        # accepted steps relax the damping, rejected ones stiffen it
+        lam[idx] = np.where(better, lam[idx] / 10, lam[idx] * 10)
+        change = np.where(better, cost[idx] - costNew, 0)
+        acc = idx[better]
+        p[acc], r[acc], cost[acc] = pNew[better], rNew[better], costNew[better]
+
+        done = (better & (change <= tol * np.maximum(cost[idx], 1e-300))) \
+            | (np.abs(step) <= tol * (np.abs(p[idx]) + tol)).all(axis=1)
+        converged[idx[done]] = True
+        active[idx[done | (lam[idx] > 1e12)]] = False
+
+    # sane results only: positive peak, center inside the unpadded window
+    p[:, 3:] = np.abs(p[:, 3:])
+    nRows = (weights > 0).any(axis=2).sum(axis=1)
+    nCols = (weights > 0).any(axis=1).sum(axis=1)
+    converged &= np.isfinite(p).all(axis=1) & (p[:, 0] > 0) \
+        & (p[:, 1] >= 0) & (p[:, 1] <= nCols - 1) & (p[:, 2] >= 0) & (p[:, 2] <= nRows - 1)
+    return p, converged
@@ -3,8 +3,9 @@
 @author: Raymond F. Pauszek III, Ph.D. (2020)
 puncta >> gui
 """
-import numpy as np
 import pathlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtWidgets import QFileDialog
 
@@ -12,14 +13,59 @@ from matplotlib.backends.backend_qt5agg import FigureCanvas
 from matplotlib.figure import Figure
 from matplotlib.widgets import RectangleSelector
 from matplotlib.gridspec import GridSpec
-import matplotlib as mpl
 
-from . import FOV
+from .plotting import CellBlitter
+from .tasks import Task, load_fov_task, fit_jobs, fit_cells_task, apply_fit
+
+# ==============================================================================
+# workers
+# ==============================================================================
+class WorkerSignals(QtCore.QObject):
+
+    progress = QtCore.pyqtSignal(int, int)
+    partial = QtCore.pyqtSignal(object)
+    result = QtCore.pyqtSignal(object)
+    error = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal()
+
+
+class Worker(QtCore.QRunnable):
+    """ runs a `tasks.Task` of `func(task, *args, **kwargs)` on a QThreadPool thread
+
+    Progress and partial results become signals, queued to the GUI
+    thread; a cancelled task emits no result, only `finished`.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.task = Task(func, *args, onProgress=self.signals.progress.emit,
+                         onPartial=self.signals.partial.emit, **kwargs)
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            status, value = self.task.run()
+            if status == "result":
+                self.signals.result.emit(value)
+            elif status == "error":
+                self.signals.error.emit(value)
+        finally:
+            self.signals.finished.emit()
 
 # ==============================================================================
 # controller
 # ==============================================================================
 class PunctaController(QtCore.QObject):
+    """ state of the picker; loading and fitting run in the background
+
+    Tasks run as `Worker`s on a QThreadPool, so the event loop stays
+    free. Fits are GIL-bound, so the tasks hand them on to a process pool
+    of `workers` processes (default all cores), started on first use.
+    Results are applied only on the GUI thread and only if their task
+    was not cancelled (see `tasks`). Cell actions before the first FOV
+    has loaded are ignored.
+    """
 
     indexChanged = QtCore.pyqtSignal(object)
     fileSelected = QtCore.pyqtSignal(object)
@@ -29,82 +75,176 @@ class PunctaController(QtCore.QObject):
     punctumSelected = QtCore.pyqtSignal(object)
     cellUpdated = QtCore.pyqtSignal(object)
     doFitPunctum = QtCore.pyqtSignal()
+    doFitAll = QtCore.pyqtSignal()
+    doCancel = QtCore.pyqtSignal()
+    progressChanged = QtCore.pyqtSignal(str, int, int)
+    busyChanged = QtCore.pyqtSignal(bool)
+    failed = QtCore.pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, maxThreads=None, workers=None, fitMode="zoom"):
         super().__init__()
         self.fov = None
         self.index = None
+        self.fitMode = fitMode
+        self.pool = QtCore.QThreadPool()
+        if maxThreads is not None:
+            self.pool.setMaxThreadCount(maxThreads)
+        self.workers = workers
+        self._executor = None
+        self._workers = set()
+        self._fitting = set()
+        self._progress = {}
 
         self.fileSelected.connect(self.open_image)
         self.cellSelected.connect(self.add_cell)
         self.punctumSelected.connect(self.add_punctum)
         self.doFitPunctum.connect(self.fit_punctum)
+        self.doFitAll.connect(self.fit_all_puncta)
+        self.doCancel.connect(self.cancel)
 
     def set_index(self, val):
+        # the slider can move before a FOV is loaded, or past a new one
+        if self.fov is None or not 0 <= val < len(self.fov):
+            return
         self.index = val
         self.indexChanged.emit(self.fov[self.index])
 
+    # ==========================================================================
+    # background tasks
+    # ==========================================================================
+    def start(self, label, func, *args, onResult=None, onPartial=None, **kwargs):
+        """ run `func` on the thread pool (see `Worker`) """
+        worker = Worker(func, *args, **kwargs)
+        worker.signals.progress.connect(lambda i, n: self.on_progress(worker, label, i, n))
+        worker.signals.error.connect(self.failed.emit)
+        worker.signals.finished.connect(lambda: self.on_finished(worker))
+        if onResult is not None:
+            worker.signals.result.connect(lambda value: worker.task.deliver(onResult, value))
+        if onPartial is not None:
+            worker.signals.partial.connect(lambda value: worker.task.deliver(onPartial, value))
+        if not self._workers:
+            self.busyChanged.emit(True)
+        self._workers.add(worker)
+        self._progress[worker] = (label, 0, 0)
+        self.pool.start(worker)
+        return worker
+
+    def on_progress(self, worker, label, done, total):
+        self._progress[worker] = (label, done, total)
+        labels = {lbl for lbl, _, _ in self._progress.values()}
+        done = sum(i for _, i, _ in self._progress.values())
+        total = sum(n for _, _, n in self._progress.values())
+        self.progressChanged.emit(", ".join(sorted(labels)), done, total)
+
+    def on_finished(self, worker):
+        self._workers.discard(worker)
+        self._progress.pop(worker, None)
+        if not self._workers:
+            self.progressChanged.emit("", 0, 0)
+            self.busyChanged.emit(False)
+
+    def cancel(self):
+        """ stop all running tasks; results they still send are dropped """
+        for worker in list(self._workers):
+            worker.task.cancel()
+        self._fitting.clear()
+
+    def shutdown(self):
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.waitForDone()
+        self._executor = None
+
+    def get_executor(self):
+        # spawned, not forked: forking a process running Qt threads can hang
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    # ==========================================================================
+    # actions
+    # ==========================================================================
     def open_image(self, filename):
-        self.fov = FOV.read_image(filename)
-        self.fov.correct_background(show=False)
+        # a newer file replaces any load still running
+        self.cancel()
+        self.start("loading", load_fov_task, filename, onResult=self.on_fov_loaded)
+
+    def on_fov_loaded(self, fov):
+        self.fov = fov
+        self.index = None
         self.fovLoaded.emit(self.fov)
 
     def add_cell(self, coords):
+        if self.fov is None:
+            return
         self.fov.add_cell(coords)
         self.lengthChanged.emit(len(self.fov))
         self.set_index(len(self.fov)-1)
 
     def add_punctum(self, coords):
-        self.fov[self.index].add_punctum(coords)
-        self.cellUpdated.emit(self.fov[self.index])
+        if self.fov is None or self.index is None:
+            return
+        cell = self.fov[self.index]
+        if cell in self._fitting:
+            return
+        cell.add_punctum(coords)
+        self.cellUpdated.emit(cell)
 
     def fit_punctum(self):
-        self.fov[self.index].fit_punctum(isTesting=False)
-        self.cellUpdated.emit(self.fov[self.index])
-
-
+        if self.fov is None or self.index is None:
+            return
+        self.fit_cells([self.fov[self.index]])
+
+    def fit_all_puncta(self):
+        """ fit every cell with a punctum, in parallel on the process pool """
+        if self.fov is not None:
+            self.fit_cells([cell for cell in self.fov if cell.punctum is not None])
+
+    def fit_cells(self, cells):
+        cells = [cell for cell in cells
+                 if cell.punctum is not None and cell not in self._fitting]
+        if not cells:
+            return
+        self._fitting.update(cells)
+        self.start("fitting", fit_cells_task, fit_jobs(cells), self.get_executor(), self.fitMode,
+                   onPartial=lambda value: self.on_cell_fitted(cells[value[0]], value[1]))
+
+    def on_cell_fitted(self, cell, fit):
+        self._fitting.discard(cell)
+        # fits of a previous FOV may still arrive after a new one is loaded
+        try:
+            applied = apply_fit(self.fov, cell, fit)
+        except Exception as err:
+            self.failed.emit(f"fit of cell {cell._id} failed: {type(err).__name__}: {err}")
+            return
+        if applied:
+            self.cellUpdated.emit(cell)
 
 
 
 # ==============================================================================
 # plotting
 # ==============================================================================
-class FOVAxes(mpl.axes.Axes):
-    name = "fov"
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.axis('off')
-
-    def plot(self, fov):
-        self.imshow(fov.img, cmap="afmhot")
-
-class CellAxes(mpl.axes.Axes):
-    name = "cell"
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.axis('off')
-
-    def plot(self, cell):
-        self.cla()
-        self.imshow(cell.img, cmap="afmhot")
-        try:
-            super().plot(*cell.punctum.get_draw_coords(), c='c')
-        except AttributeError:
-            pass
-        self.axis('off')
-
-mpl.projections.register_projection(FOVAxes)
-mpl.projections.register_projection(CellAxes)
-
 class PunctaPickerCanvas(FigureCanvas):
+    """ the FOV and the selected cell side by side
+
+    Switching cells only redraws the cell axes (see `plotting.CellBlitter`).
+    Changes arriving faster than `frameInterval` ms (eg. while dragging
+    the cell slider) are coalesced, so only the latest cell is drawn once
+    per frame.
+    """
+    frameInterval = 16
 
     def __init__(self, controller):
         self.controller = controller
         self.fig = Figure()
         super().__init__(self.fig)
         self.fig.set_tight_layout(True)
+        self._pending = None
+        self._throttle = QtCore.QTimer(self, singleShot=True, interval=self.frameInterval)
+        self._throttle.timeout.connect(self.flush_cell)
         self.layout()
         self.connect()
 
@@ -118,19 +258,31 @@ class PunctaPickerCanvas(FigureCanvas):
         self.controller.indexChanged.connect(self.on_change_cell)
         self.controller.cellUpdated.connect(self.on_change_cell)
         self.mpl_connect('button_release_event', self.on_release)
+        self.blitter = CellBlitter(self, self.axCell)
 
         rectProps = {"alpha": 0.5, "facecolor": "#E5FF00"}
         spanArgs = {"useblit": True, "button": 1, "rectprops": rectProps}
         self.zoomSpan = RectangleSelector(self.axFOV, self.on_zoom, **spanArgs)
 
     def on_load_fov(self, fov):
+        self._pending = None
         self.axFOV.plot(fov)
-        self.draw()
+        self.axCell.reset()
+        self.blitter.invalidate()
+        self.draw_idle()
 
     def on_change_cell(self, cell):
-        # self.axCell.cla()
-        self.axCell.plot(cell)
-        self.draw()
+        self._pending = cell
+        if not self._throttle.isActive():
+            self.flush_cell()
+
+    def flush_cell(self):
+        """ draw the latest pending cell, then hold further draws for a frame """
+        cell, self._pending = self._pending, None
+        if cell is None:
+            return
+        self._throttle.start()
+        self.blitter.show(cell)
 
     def on_zoom(self, evt1, evt2):
         self.controller.cellSelected.emit([int(evt1.xdata), int(evt2.xdata), int(evt1.ydata), int(evt2.ydata)])
@@ -199,3 +351,36 @@ class FitButton(QtWidgets.QPushButton):
         self.controller = controller
         super().__init__("Find Punctum", **kwargs)
         self.clicked.connect(self.controller.doFitPunctum.emit)
+
+
+class FitAllButton(QtWidgets.QPushButton):
+
+    def __init__(self, controller, **kwargs):
+        self.controller = controller
+        super().__init__("Fit All", **kwargs)
+        self.clicked.connect(self.controller.doFitAll.emit)
+
+
+class CancelButton(QtWidgets.QPushButton):
+
+    def __init__(self, controller, **kwargs):
+        self.controller = controller
+        super().__init__("Cancel", **kwargs)
+        self.setEnabled(False)
+        self.clicked.connect(self.controller.doCancel.emit)
+        self.controller.busyChanged.connect(self.setEnabled)
+
+
+class TaskProgressBar(QtWidgets.QProgressBar):
+
+    def __init__(self, controller, **kwargs):
+        self.controller = controller
+        super().__init__(**kwargs)
+        self.setMaximumWidth(200)
+        self.setValue(0)
+        self.controller.progressChanged.connect(self.update_progress)
+
+    def update_progress(self, label, done, total):
+        self.setMaximum(max(total, 1))
+        self.setValue(done)
+        self.setFormat(f"{label} %p%" if label else "")
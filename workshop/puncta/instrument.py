@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> instrument
+"""
+
+import json
+import time
+import cProfile
+import functools
+import tracemalloc
+from collections import deque, defaultdict
+from contextlib import nullcontext
+
+_NULL = nullcontext()
+
+
+def read_io():
+    """ (bytes read, bytes written) by this process so far, None if unknown
+
+    From /proc/self/io (rchar, wchar): all bytes through read and write
+    calls, cached or not. Only available on Linux.
+    """
+    try:
+        with open("/proc/self/io", "rb") as f:
+            counters = dict(line.split(b":") for line in f.read().splitlines())
+        return int(counters[b"rchar"]), int(counters[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class Instrument():
+    """ records wall time, CPU time, I/O bytes and peak memory per stage
+
+    Disabled by default: `stage` then returns a shared no-op context and
+    `timed` functions call straight through, so the cost is one attribute
+    check. `enable` switches recording on at runtime, optionally with
+    tracemalloc (peak memory per stage) and cProfile (over the outermost
+    stages; see `profiler`). At most `maxRecords` records are kept.
+    """
+
+    def __init__(self, maxRecords=10**6):
+        self.enabled = False
+        self.records = deque(maxlen=maxRecords)
+        self.profiler = None
+        self._stack = []
+        self._tracing = False
+
+    def enable(self, profile=False, memory=False):
+        self.enabled = True
+        if profile and self.profiler is None:
+            self.profiler = cProfile.Profile()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def disable(self):
+        self.enabled = False
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def clear(self):
+        self.records.clear()
+        self.profiler = cProfile.Profile() if self.profiler is not None else None
+
+    def stage(self, name, **labels):
+        """ context recording one run of stage `name`, tagged with `labels` """
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name, labels)
+
+    def timed(self, name=None, labels=None):
+        """ decorator recording every call as a stage
+
+        `labels` is called with the function's arguments and returns the
+        labels of the record, eg. `lambda self, *a, **k: {"cell": self._id}`.
+        """
+        def decorate(func):
+            stageName = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Stage(self, stageName, labels(*args, **kwargs) if labels else {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def write_jsonl(self, filename):
+        write_jsonl(self.records, filename)
+
+    def write_prometheus(self, filename):
+        write_prometheus(self.records, filename)
+
+
+class _Stage():
+
+    def __init__(self, instrument, name, labels):
+        self._instrument = instrument
+        self.record = {"stage": name, **labels}
+
+    def __enter__(self):
+        inst = self._instrument
+        if not inst._stack and inst.profiler is not None:
+            inst.profiler.enable()
+        self._childPeak = 0
+        if tracemalloc.is_tracing():
+            self._mem0, peak = tracemalloc.get_traced_memory()
+            if inst._stack:
+                # keep the parent's peak so far, reset_peak loses it
+                inst._stack[-1]._childPeak = max(inst._stack[-1]._childPeak, peak)
+            tracemalloc.reset_peak()
+        inst._stack.append(self)
+        self._io = read_io()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        io = read_io()
+        inst = self._instrument
+        inst._stack.pop()
+        rec = self.record
+        rec["wall"], rec["cpu"] = wall, cpu
+        if io is not None and self._io is not None:
+            rec["bytesRead"], rec["bytesWritten"] = io[0] - self._io[0], io[1] - self._io[1]
+        if tracemalloc.is_tracing() and hasattr(self, "_mem0"):
+            peak = max(tracemalloc.get_traced_memory()[1], self._childPeak) - self._mem0
+            rec["peakMemory"] = max(peak, 0)
+            if inst._stack:
+                inst._stack[-1]._childPeak = max(inst._stack[-1]._childPeak,
+                                                 self._mem0 + rec["peakMemory"])
+        if not inst._stack and inst.profiler is not None:
+            inst.profiler.disable()
+        inst.records.append(rec)
+        return False
+
+
+INSTRUMENT = Instrument()
+
+
+# ==============================================================================
+# export
+# ==============================================================================
+def write_jsonl(records, filename):
+    """ append `records` to a JSON-lines file """
+    with open(filename, "a") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+def write_prometheus(records, filename, prefix="puncta_stage"):
+    """ per-stage totals in the Prometheus text format, for a textfile collector """
+    totals = defaultdict(lambda: defaultdict(float))
+    for rec in records:
+        t = totals[rec["stage"]]
+        t["calls"] += 1
+        t["wall"] += rec.get("wall", 0)
+        t["cpu"] += rec.get("cpu", 0)
+        t["bytesRead"] += rec.get("bytesRead", 0)
+        t["bytesWritten"] += rec.get("bytesWritten", 0)
+        t["peakMemory"] = max(t["peakMemory"], rec.get("peakMemory", 0))
+    metrics = [("calls_total", "calls", "counter", "stage runs"),
+               ("wall_seconds_total", "wall", "counter", "wall time"),
+               ("cpu_seconds_total", "cpu", "counter", "CPU time of this process"),
+               ("read_bytes_total", "bytesRead", "counter", "bytes read"),
+               ("written_bytes_total", "bytesWritten", "counter", "bytes written"),
+               ("peak_memory_bytes", "peakMemory", "gauge", "largest traced peak memory")]
+    lines = []
+    for metric, key, kind, doc in metrics:
+        lines += [f"# HELP {prefix}_{metric} {doc}", f"# TYPE {prefix}_{metric} {kind}"]
+        lines += [f'{prefix}_{metric}{{stage="{stage}"}} {t[key]:g}'
+                  for stage, t in sorted(totals.items())]
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
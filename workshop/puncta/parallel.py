@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> parallel
+"""
+
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from .fitting import fit_windows
+
+# windows of the batched fits: "native" around the seed, "crop" the whole crop
+BATCH_MODES = ("native", "crop")
+
+
+def get_executor(workers=None, executor=None):
+    """ `executor` if given, else a new process pool of `workers` processes """
+    if executor is not None:
+        return executor
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+
+# ==============================================================================
+# cells
+# ==============================================================================
+def fit_cells(cells, workers=None, chunkSize=64, model="circle", mode="native",
+              executor=None, **kwargs):
+    """ fit the punctum of every cell on a process pool
+
+    Only the cell crops are shared with the workers: they are copied once
+    into a memory-mapped scratch file that every worker maps read-only,
+    so the full FOV image is never pickled. Each task fits `chunkSize`
+    cells with the batched engine (`fitting.fit_windows`), on windows
+    chosen by `mode` as in `FOV.fit_all_puncta`. Results are
+    applied in cell order, independent of completion order.
+
+    `executor` can be an existing pool to reuse across calls.
+    Returns the convergence flags.
+    """
+    if mode not in BATCH_MODES:
+        raise ValueError(f"unknown fit mode '{mode}'")
+    cells = list(cells)
+    converged = np.zeros(len(cells), dtype=bool)
+    if not cells:
+        return converged
+    windows = [cell.get_window(native=(mode == "native")) for cell in cells]
+    crops = [np.asarray(w[0], dtype=float) for w in windows]
+    shapes = [c.shape for c in crops]
+    offsets = np.concatenate(([0], np.cumsum([c.size for c in crops])))
+    seeds = [np.subtract(cell.get_seed(), (c0, r0))
+             for cell, (_, c0, r0) in zip(cells, windows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "crops.f8")
+        mm = np.memmap(path, dtype=float, mode="w+", shape=(max(offsets[-1], 1),))
+        for c, o in zip(crops, offsets):
+            mm[o:o+c.size] = c.ravel()
+        mm.flush()
+        del mm
+
+        pool = get_executor(workers, executor)
+        try:
+            futures = [pool.submit(_fit_chunk, path, start,
+                                   offsets[start:start+chunkSize+1],
+                                   shapes[start:start+chunkSize],
+                                   seeds[start:start+chunkSize], model, kwargs)
+                       for start in range(0, len(cells), chunkSize)]
+            results = [f.result() for f in futures]
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    for start, params, ok in sorted(results, key=lambda res: res[0]):
+        for cell, (_, c0, r0), beta, flag in zip(cells[start:], windows[start:], params, ok):
+            cell.set_fit(beta, flag, origin=(c0, r0))
+        converged[start:start+len(ok)] = ok
+    return converged
+
+def _fit_chunk(path, start, offsets, shapes, seeds, model, kwargs):
+    mm = np.memmap(path, dtype=float, mode="r")
+    crops = [np.array(mm[o:o+h*w]).reshape(h, w) for o, (h, w) in zip(offsets, shapes)]
+    del mm
+    params, ok = fit_windows(crops, seeds=seeds, model=model, **kwargs)
+    return start, params, ok
+
+def fit_crop(crop, seed, mode="zoom"):
+    """ `Cell.fit_punctum` of a detached cell crop, for a worker process
+
+    `seed` is the punctum (x, y, r) in crop coordinates. Returns the
+    fitted (x, y, r) and the convergence flag (None if not reported).
+    """
+    from .data import FOV, Cell
+    from .round_things import Circle
+    h, w = crop.shape
+    cell = Cell(FOV(crop, id_="crop"), [0, w, 0, h], punctum=Circle(*seed[:2], r=seed[2]))
+    cell.fit_punctum(isTesting=False, mode=mode)
+    p = cell.punctum
+    return (float(p.x), float(p.y), float(p.r)), cell.converged
+
+
+# ==============================================================================
+# files
+# ==============================================================================
+def map_files(func, filenames, workers=None, executor=None):
+    """ run `func(filename)` for many files on a process pool
+
+    `func` must be a picklable module-level function; it receives only
+    the filename, so each worker reads its own data. Returns the results
+    in the order of `filenames`.
+    """
+    filenames = list(filenames)
+    pool = get_executor(workers, executor)
+    try:
+        return list(pool.map(func, filenames))
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+def refit_file(filename, model="circle"):
+    """ load a saved FOV, fit all its puncta and save it in place """
+    from .data import FOV
+    fov = FOV.load(filename)
+    converged = fov.fit_all_puncta(model=model)
+    fov.save(filename)
+    return filename, len(fov), int(converged.sum())
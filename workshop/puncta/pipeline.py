@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> pipeline
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from .data import FOV
+from .cache import FitCache
+from .instrument import INSTRUMENT
+from .parallel import get_executor
+
+STAGES = ("read", "background", "detect", "fit", "write")
+
+
+def output_name(filename, outDir):
+    return Path(outDir) / (Path(filename).stem + ".hdf5")
+
+def process_file(filename, outDir, method="reconstruction", sigma=1.5,
+                 model="circle", mode="native", compression="gzip", dtype="float64",
+                 fitCache=False, instrument=False, profile=False, traceMemory=False):
+    """ read, background-correct, detect, fit and save one image
+
+    The FOV is written to `outDir`/<stem>.hdf5 under a temporary name and
+    renamed when complete, so an existing output is always a finished
+    one. The corrected image is computed in `dtype`. Returns a record with
+    the time of every stage in seconds, the cell and converged fit counts,
+    or the error if the file failed. With `fitCache`, fits are cached in
+    a sidecar `outDir`/<stem>.fitcache.h5, so a rerun only fits cells
+    whose window, seed or settings changed.
+
+    With `instrument`, the record's "stages" hold the `instrument` records
+    of this file (with peak memory if `traceMemory`); with `profile`, a
+    cProfile of the file is dumped to `outDir`/<stem>.pstats.
+    """
+    record = {"file": str(filename)}
+    if instrument or profile:
+        INSTRUMENT.clear()
+        INSTRUMENT.enable(profile=profile, memory=traceMemory)
+    t0 = time.perf_counter()
+    try:
+        tic = time.perf_counter()
+        fov = FOV.read_image(filename, dtype=dtype)
+        record["read"] = time.perf_counter() - tic
+
+        tic = time.perf_counter()
+        fov.correct_background(method=method)
+        record["background"] = time.perf_counter() - tic
+
+        tic = time.perf_counter()
+        fov.detect_puncta(sigma=sigma)
+        record["detect"] = time.perf_counter() - tic
+
+        tic = time.perf_counter()
+        if fitCache:
+            out = output_name(filename, outDir)
+            with FitCache(out.with_name(out.stem + ".fitcache.h5")) as cache:
+                converged = fov.fit_all_puncta(model=model, mode=mode, cache=cache)
+            record["cacheHits"] = cache.hits
+        else:
+            converged = fov.fit_all_puncta(model=model, mode=mode)
+        record["fit"] = time.perf_counter() - tic
+
+        tic = time.perf_counter()
+        out = output_name(filename, outDir)
+        part = out.with_name(out.name + ".part")
+        fov.save(part, compression=compression)
+        os.replace(part, out)
+        record["write"] = time.perf_counter() - tic
+
+        record["cells"] = len(fov)
+        record["converged"] = int(converged.sum())
+    except Exception as err:
+        record["error"] = f"{type(err).__name__}: {err}"
+    record["total"] = time.perf_counter() - t0
+    if INSTRUMENT.enabled:
+        INSTRUMENT.disable()
+        record["stages"] = list(INSTRUMENT.records)
+        if profile:
+            INSTRUMENT.profiler.dump_stats(Path(outDir) / (Path(filename).stem + ".pstats"))
+        INSTRUMENT.clear()
+        INSTRUMENT.profiler = None
+    return record
+
+def run(filenames, outDir, workers=None, maxInFlight=None, resume=True,
+        executor=None, **kwargs):
+    """ process many images on a process pool, yielding records as they finish
+
+    Each file is one task: a worker runs all stages of it in sequence, so
+    the parallelism is across files, up to `workers` at a time (default
+    all cores; give the size of `executor` when passing one). At most
+    `maxInFlight` files (default twice the workers) are submitted at any
+    time, so memory stays flat however many files there are. With
+    `resume`, files whose output already exists are skipped. `kwargs` are
+    passed to `process_file`.
+    """
+    Path(outDir).mkdir(parents=True, exist_ok=True)
+    pending = iter(f for f in filenames
+                   if not (resume and output_name(f, outDir).exists()))
+    workers = workers or os.cpu_count()
+    pool = get_executor(workers, executor)
+    limit = maxInFlight or 2*workers
+    try:
+        inFlight = set()
+        while True:
+            for filename in pending:
+                inFlight.add(pool.submit(process_file, filename, outDir, **kwargs))
+                if len(inFlight) >= limit:
+                    break
+            if not inFlight:
+                break
+            done, inFlight = wait(inFlight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+def summarize(records):
+    """ printable table of total and mean time per stage """
+    ok = [r for r in records if "error" not in r]
+    lines = [f"{len(records)} files, {len(records) - len(ok)} failed, "
+             f"{sum(r['cells'] for r in ok)} cells, {sum(r['converged'] for r in ok)} fits converged",
+             f"{'stage':<12} {'total s':>9} {'mean s':>8}"]
+    for stage in STAGES + ("total",):
+        values = [r[stage] for r in ok]
+        if values:
+            lines.append(f"{stage:<12} {sum(values):>9.2f} {sum(values)/len(values):>8.3f}")
+    return "\n".join(lines)
+
+def log_record(record, logFile):
+    """ append one record, without its stages, to a JSON-lines log """
+    record = {k: v for k, v in record.items() if k != "stages"}
+    with open(logFile, "a") as f:
+        f.write(json.dumps(record) + "\n")
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> plotting
+"""
+import matplotlib as mpl
+import matplotlib.axes
+import matplotlib.projections
+
+# ==============================================================================
+# axes
+# ==============================================================================
+class FOVAxes(mpl.axes.Axes):
+    name = "fov"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.axis('off')
+        self._image = None
+
+    def plot(self, fov):
+        """ show `fov`, reusing the image artist of the last one """
+        if self._image is None:
+            self._image = self.imshow(fov.img, cmap="afmhot")
+            return
+        h, w = fov.img.shape
+        self._image.set_data(fov.img)
+        self._image.set_extent((-0.5, w-0.5, h-0.5, -0.5))
+        self._image.autoscale()
+        self.set_xlim(-0.5, w-0.5)
+        self.set_ylim(h-0.5, -0.5)
+
+class CellAxes(mpl.axes.Axes):
+    """ one cell crop with its punctum outline
+
+    The image and outline are animated artists made once and updated in
+    place, so a canvas can blit this axes alone; see `draw_animated`.
+    """
+    name = "cell"
+    outlineTol = 0.1
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.axis('off')
+        self._image = None
+        self._outline = None
+        self._shape = None
+
+    def plot(self, cell):
+        """ show `cell`; True if the crop size changed and the axes need a full draw """
+        img = cell.img
+        resized = img.shape != self._shape
+        if self._image is None:
+            self._image = self.imshow(img, cmap="afmhot", animated=True)
+            self._outline, = super().plot([], [], c='c', animated=True)
+            self.set_autoscale_on(False)
+        else:
+            self._image.set_data(img)
+            self._image.autoscale()
+        if resized:
+            h, w = img.shape
+            self._image.set_extent((-0.5, w-0.5, h-0.5, -0.5))
+            self.set_xlim(-0.5, w-0.5)
+            self.set_ylim(h-0.5, -0.5)
+        self._shape = img.shape
+        try:
+            self._outline.set_data(*cell.punctum.get_draw_coords(tol=self.outlineTol))
+        except AttributeError:
+            self._outline.set_data([], [])
+        self._image.set_visible(True)
+        self._outline.set_visible(True)
+        return resized
+
+    def reset(self):
+        """ hide the cell, eg. when a new FOV is loaded """
+        if self._image is not None:
+            self._image.set_visible(False)
+            self._outline.set_visible(False)
+
+    def draw_animated(self):
+        if self._image is not None:
+            self.draw_artist(self._image)
+            self.draw_artist(self._outline)
+
+mpl.projections.register_projection(FOVAxes)
+mpl.projections.register_projection(CellAxes)
+
+# ==============================================================================
+# blitting
+# ==============================================================================
+class CellBlitter():
+    """ redraws a `CellAxes` alone, over a background saved on full draws
+
+    Every full draw of `canvas` saves the cell axes without its animated
+    artists. `show` then restores that region, draws the cell artists and
+    blits the axes. The background is dropped when the canvas is resized
+    or the axes moves, and a full draw is requested instead.
+    """
+
+    def __init__(self, canvas, ax):
+        self.canvas = canvas
+        self.ax = ax
+        self._background = None
+        self._bounds = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+        canvas.mpl_connect('resize_event', self.invalidate)
+
+    def invalidate(self, evt=None):
+        self._background = None
+
+    def on_draw(self, evt):
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._bounds = self.ax.bbox.bounds
+        self.ax.draw_animated()
+
+    def show(self, cell):
+        """ draw `cell`; True if blitted, False if a full draw was requested """
+        resized = self.ax.plot(cell)
+        if resized or self._background is None or self.ax.bbox.bounds != self._bounds:
+            self._background = None
+            self.canvas.draw_idle()
+            return False
+        self.canvas.restore_region(self._background)
+        self.ax.draw_animated()
+        self.canvas.blit(self.ax.bbox)
+        return True
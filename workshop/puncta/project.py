@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> project
+"""
+
+import numpy as np
+import h5py
+
+from .data import FOV, CELL_DTYPE, encode_ids
+
+# one row per stored FOV
+INDEX_DTYPE = np.dtype([("id", "S64"), ("cells", "i8"), ("puncta", "i8"),
+                        ("height", "i8"), ("width", "i8")])
+
+# stored puncta across FOVs: the cell table with the FOV id in front
+PUNCTA_DTYPE = np.dtype([("fov", "S64")] + CELL_DTYPE.descr)
+
+
+class Project():
+    """ many FOVs in one HDF5 file, with an index
+
+    Each FOV is written with `FOV.write` into its own group under "fovs",
+    so FOVs can be added, replaced or removed one at a time. The "index"
+    table holds the id, cell and punctum counts and image size of every
+    FOV, so listing a project or querying its puncta reads no images.
+    HDF5 does not reclaim the space of removed or replaced FOVs; copy the
+    project with h5repack to compact it. FOV and cell ids are stored in
+    64 bytes; longer ones are refused.
+
+    Opened read-only (mode "r"), a file that is not a project yet reads
+    as an empty one.
+    """
+
+    def __init__(self, filename, mode="a"):
+        self._file = h5py.File(filename, mode)
+        if "fovs" not in self._file and self._file.mode != "r":
+            self._file.create_group("fovs")
+            self._file.create_dataset("index", shape=(0,), maxshape=(None,),
+                                      dtype=INDEX_DTYPE, chunks=(1024,))
+        self._puncta = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self):
+        return self._file["index"].shape[0] if "index" in self._file else 0
+
+    def __contains__(self, id_):
+        return "fovs" in self._file and str(id_) in self._file["fovs"]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __getitem__(self, id_):
+        return self.load(id_)
+
+    def __str__(self):
+        return f"Project {self._file.filename}\t[{len(self)} FOVs]"
+
+    @property
+    def index(self):
+        """ INDEX_DTYPE table of all FOVs """
+        if "index" not in self._file:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return self._file["index"][()]
+
+    @property
+    def ids(self):
+        return np.char.decode(self.index["id"]).tolist()
+
+    # ==========================================================================
+    # FOVs
+    # ==========================================================================
+    def load(self, id_, lazy=False, cacheBytes=256*2**20):
+        """ FOV `id_`; a lazy FOV stays valid while the project is open """
+        return FOV.read(self._file["fovs"][str(id_)], lazy=lazy, cacheBytes=cacheBytes)
+
+    def add(self, fov, replace=False, **kwargs):
+        """ store `fov` (see `FOV.write` for `kwargs`)
+
+        An FOV with the same id is an error unless `replace`.
+        """
+        key = str(fov._id)
+        # refuse ids that do not fit before touching the file
+        encode_ids([key], INDEX_DTYPE["id"])
+        encode_ids(cell._id for cell in fov)
+        fovs = self._file["fovs"]
+        if key in fovs:
+            if not replace:
+                raise ValueError(f"FOV {key} is already in the project")
+            del fovs[key]
+        fov.write(fovs.create_group(key), **kwargs)
+        self._set_row(fov)
+
+    def update_cells(self, fov):
+        """ rewrite only the cell table of a stored FOV, not its images """
+        key = str(fov._id)
+        if key not in self:
+            raise KeyError(key)
+        fov.write_cells(self._file["fovs"][key])
+        self._set_row(fov)
+
+    def remove(self, id_):
+        key = str(id_)
+        del self._file["fovs"][key]
+        index = self.index
+        index = index[index["id"] != key.encode()]
+        self._file["index"].resize((len(index),))
+        self._file["index"][:] = index
+        self._puncta.pop(key, None)
+
+    def _set_row(self, fov):
+        key = str(fov._id)
+        table = self._file["fovs"][key]["cells"][()]
+        row = np.array((key.encode(), len(table), np.isfinite(table["x"]).sum(),
+                        *fov.img.shape), dtype=INDEX_DTYPE)
+        dset = self._file["index"]
+        where = np.flatnonzero(dset["id"] == key.encode())
+        if where.size:
+            dset[where[0]] = row
+        else:
+            dset.resize((dset.shape[0] + 1,))
+            dset[-1] = row
+        self._puncta.pop(key, None)
+
+    # ==========================================================================
+    # queries
+    # ==========================================================================
+    def get_puncta(self, fovs=None, converged=None):
+        """ PUNCTA_DTYPE table of the stored puncta, reading no images
+
+        `fovs` limits the table to some FOV ids; with `converged`, only
+        puncta whose fit did (True) or did not (False) converge. Tables are
+        cached per FOV until it is changed. Filter further with numpy,
+        eg. `p[p["r"] > 3]`.
+        """
+        ids = self.ids if fovs is None else [str(f) for f in fovs]
+        parts = []
+        for key in ids:
+            if key not in self._puncta:
+                table = self._file["fovs"][key]["cells"][()]
+                table = table[np.isfinite(table["x"])]
+                part = np.empty(len(table), dtype=PUNCTA_DTYPE)
+                part["fov"] = key.encode()
+                for name in CELL_DTYPE.names:
+                    part[name] = table[name]
+                self._puncta[key] = part
+            parts.append(self._puncta[key])
+        puncta = np.concatenate(parts) if parts else np.empty(0, dtype=PUNCTA_DTYPE)
+        if converged is not None:
+            puncta = puncta[puncta["status"] == int(converged)]
+        return puncta
@@ -9,10 +9,13 @@ from scipy.optimize import curve_fit
 import matplotlib.pyplot as plt
 import json
 
+from shapes.round_things import n_circle_vertices
+
 __all__ = ["Circle"]
 
 
 class Shape():
+    __slots__ = ("x", "y")
 
     def __init__(self, x, y):
         self.x = x
@@ -35,6 +38,7 @@ class Shape():
 
 
 class Circle(Shape):
+    __slots__ = ("_r",)
 
     def __init__(self, x=0, y=0, r=1):
         super().__init__(x=x, y=y)
@@ -70,8 +74,11 @@ class Circle(Shape):
     def get_area(self):
         return np.pi * self.r**2
 
-    def get_draw_coords(self):
-        t = np.linspace(0, 2*np.pi, 360)
+    def get_draw_coords(self, tol=None):
+        """ `tol` is the largest allowed distance between the drawn outline
+        and the true circle; None draws at full resolution """
+        n = 360 if tol is None else n_circle_vertices(self.r, tol) + 1
+        t = np.linspace(0, 2*np.pi, n)
         x = self.x + self.r*np.cos(t)
         y = self.y + self.r*np.sin(t)
         return x, y
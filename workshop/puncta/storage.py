@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> storage
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+
+class ChunkCache():
+    """ least-recently-used store of decompressed chunks, bounded in bytes """
+
+    def __init__(self, maxBytes=256*2**20):
+        self.maxBytes = maxBytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._chunks = OrderedDict()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def get(self, key, read):
+        """ chunk stored under `key`, calling `read()` to load it if missing """
+        try:
+            chunk = self._chunks.pop(key)
+            self.hits += 1
+        except KeyError:
+            chunk = read()
+            self.misses += 1
+            self.nbytes += chunk.nbytes
+        self._chunks[key] = chunk
+        while self.nbytes > self.maxBytes and len(self._chunks) > 1:
+            _, old = self._chunks.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return chunk
+
+    def clear(self):
+        self._chunks.clear()
+        self.nbytes = 0
+
+
+class LazyImage():
+    """ an open 2D HDF5 dataset, or one channel of an (H, W, C) one, read on demand
+
+    Slicing reads only the chunks the region touches; decompressed chunks
+    (all channels of a stacked dataset) go through a `ChunkCache` that
+    several images can share. Reading the whole image bypasses the cache.
+    Datasets stored contiguously are read in `tileSize` squares instead.
+    """
+
+    def __init__(self, dataset, channel=None, cache=None, tileSize=256):
+        self._data = dataset
+        self._channel = channel
+        self.cache = ChunkCache() if cache is None else cache
+        self.shape = dataset.shape[:2]
+        self.dtype = dataset.dtype
+        self.ndim = 2
+        self._tile = dataset.chunks[:2] if dataset.chunks else (tileSize, tileSize)
+        self._key = (dataset.file.filename, dataset.name)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        if self._channel is None:
+            return np.asarray(self._data[()], dtype=dtype)
+        return np.asarray(self._data[:, :, self._channel], dtype=dtype)
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        index = index + (slice(None),) * (2 - len(index))
+        bounds, squeeze = [], []
+        for k, (i, n) in enumerate(zip(index, self.shape)):
+            if isinstance(i, (int, np.integer)):
+                i = slice(i % n, i % n + 1) if -n <= i < n else None
+                squeeze.append(k)
+            if not isinstance(i, slice) or i.indices(n)[2] != 1:
+                return np.asarray(self)[index]
+            start, stop, _ = i.indices(n)
+            bounds.append((start, max(start, stop)))
+        (r0, r1), (c0, c1) = bounds
+        if (r0, r1, c0, c1) == (0, self.shape[0], 0, self.shape[1]):
+            return np.squeeze(np.asarray(self), axis=tuple(squeeze))
+        return np.squeeze(self._read(r0, r1, c0, c1), axis=tuple(squeeze))
+
+    def _read(self, r0, r1, c0, c1):
+        th, tw = self._tile
+        out = np.empty((r1 - r0, c1 - c0), dtype=self.dtype)
+        for i in range(r0 // th, -(-r1 // th)):
+            for j in range(c0 // tw, -(-c1 // tw)):
+                chunk = self.cache.get(self._key + (i, j), lambda: self._data[
+                    i*th:(i+1)*th, j*tw:(j+1)*tw])
+                rs = slice(max(r0, i*th), min(r1, (i+1)*th))
+                cs = slice(max(c0, j*tw), min(c1, (j+1)*tw))
+                chunk = chunk[rs.start-i*th:rs.stop-i*th, cs.start-j*tw:cs.stop-j*tw]
+                if self._channel is not None:
+                    chunk = chunk[..., self._channel]
+                out[rs.start-r0:rs.stop-r0, cs.start-c0:cs.stop-c0] = chunk
+        return out
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Raymond F. Pauszek III, Ph.D. (2020)
+puncta >> tasks
+
+Background tasks of the picker and the rules for applying their results,
+without Qt; `gui.Worker` runs a `Task` on a Qt thread pool.
+"""
+
+import threading
+import numpy as np
+from concurrent.futures import as_completed
+
+from . import FOV, Circle
+from .parallel import fit_crop
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Task():
+    """ runs `func(task, *args, **kwargs)`, which can be cancelled between steps
+
+    `func` reports through the task: `report` for progress, `send` for
+    partial results and `check_cancelled` between steps, which ends it
+    once `cancel` was called. Reports go to `onProgress(done, total)` and
+    `onPartial(value)`, on the thread running the task.
+    """
+
+    def __init__(self, func, *args, onProgress=None, onPartial=None, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.onProgress = onProgress
+        self.onPartial = onPartial
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def report(self, done, total):
+        if self.onProgress is not None:
+            self.onProgress(done, total)
+
+    def send(self, value):
+        if self.onPartial is not None:
+            self.onPartial(value)
+
+    def run(self):
+        """ ("result", value), ("error", message) or ("cancelled", None) """
+        try:
+            self.check_cancelled()
+            result = self.func(self, *self.args, **self.kwargs)
+            self.check_cancelled()
+        except Cancelled:
+            return "cancelled", None
+        except Exception as err:
+            return "error", f"{type(err).__name__}: {err}"
+        return "result", result
+
+    def deliver(self, slot, value):
+        """ `slot(value)`, unless the task was cancelled since `value` was sent """
+        if not self.cancelled:
+            slot(value)
+
+
+# ==============================================================================
+# tasks
+# ==============================================================================
+def load_fov_task(task, filename):
+    """ read and background-correct an image """
+    task.report(0, 2)
+    fov = FOV.read_image(filename)
+    task.check_cancelled()
+    task.report(1, 2)
+    fov.correct_background(show=False)
+    task.report(2, 2)
+    return fov
+
+def fit_jobs(cells):
+    """ (crop, seed) snapshots of `cells` for `fit_cells_task` """
+    return [(np.array(cell.img), (cell.punctum.x, cell.punctum.y, cell.punctum.r))
+            for cell in cells]
+
+def fit_cells_task(task, jobs, executor, mode):
+    """ fit (crop, seed) snapshots of cells on a process pool
+
+    Sends (job index, fit) as each fit finishes, where fit is the result
+    of `parallel.fit_crop` or the exception it raised. Cells are never
+    touched here; see `apply_fit`.
+    """
+    futures = {executor.submit(fit_crop, crop, seed, mode): i
+               for i, (crop, seed) in enumerate(jobs)}
+    try:
+        for j, future in enumerate(as_completed(futures)):
+            task.check_cancelled()
+            try:
+                fit = future.result()
+            except Exception as err:
+                fit = err
+            task.send((futures[future], fit))
+            task.report(j+1, len(jobs))
+    finally:
+        for future in futures:
+            future.cancel()
+    return len(jobs)
+
+def apply_fit(fov, cell, fit):
+    """ set a fit sent by `fit_cells_task` on `cell`; False if it was dropped
+
+    Fits of cells not in `fov`, eg. of a FOV replaced while fitting, are
+    dropped. A failed fit raises the exception it carries.
+    """
+    if cell._parent is not fov:
+        return False
+    if isinstance(fit, Exception):
+        raise fit
+    (x, y, r), converged = fit
+    cell.punctum = Circle(x, y, r=r)
+    if converged is not None:
+        cell.converged = converged
+    return True
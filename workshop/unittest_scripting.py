@@ -5,7 +5,10 @@ puncta unittest => scripting
 """
 import numpy as np
 import matplotlib.pyplot as plt
+import sys
 from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))   # shapes
 from puncta import FOV
 
 filename = Path("./sample_image.tif")